@@ -0,0 +1,78 @@
+'''
+Shared image cache for the dash.
+Every PNG is decoded and converted to the display format once, then the same
+surface is handed to everything that asks for it.
+
+At start up prefetch() hands every path to a thread pool, PNG decoding
+releases the GIL so the decodes run across all cores while the main thread
+imports the rest of the dash and starts compiling the layout.  load_image()
+then only waits for the one image it needs, and does the convert_alpha() on
+the main thread.
+
+Faster still is not decoding at all: use_bundle() maps a prebaked bundle of
+raw display format pixels (see bundle.py), and every image in it is served
+from the mapping without touching the PNG.
+'''
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+from bundle import AssetBundle, bake, display_format
+
+_images = {}    #   path -> converted surface
+_decoding = {}  #   path -> Future of the decoded, not yet converted surface
+_bundle = None  #   mapped AssetBundle, when there is a current one
+
+
+def use_bundle(path, paths):
+    '''Serve images from the bundle at path from now on, False when it is missing, stale or not baked for paths'''
+    global _bundle
+    _bundle = AssetBundle.open(path, display_format())
+    if _bundle is not None and set(_bundle.images) != set(paths):
+        print(f"[ASSETS] {path} was baked for a different set of images")
+        _bundle = None
+    return _bundle is not None
+
+
+def rebake(path, paths):
+    '''Bake a fresh bundle on a background thread, for the next start - the running dash carries on with its PNGs'''
+    fmt = display_format() or "BGRA"
+
+    def run():
+        size = bake(paths, path, fmt)
+        print(f"[ASSETS] Baked {len(paths)} images into {path}, {size / 1e6:.1f} MB")
+    thread = threading.Thread(target=run, name="assets-bake", daemon=True)
+    thread.start()
+    return thread
+
+
+def prefetch(paths, workers=None):
+    '''Start decoding these PNGs in the background, in order, load_image() picks them up'''
+    pool = ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1, thread_name_prefix="assets")
+    for path in paths:
+        if path not in _images and path not in _decoding and (_bundle is None or path not in _bundle):
+            _decoding[path] = pool.submit(pygame.image.load, path)
+    pool.shutdown(wait=False)
+
+
+def load_image(path):
+    '''Load and convert_alpha a PNG, only the first call touches the disk'''
+    image = _images.get(path)
+    if image is None:
+        if _bundle is not None and path in _bundle:
+            #   Already in the display format, the surface is the mapped pixels themselves
+            image = _bundle.surface(path)
+        else:
+            pending = _decoding.pop(path, None)
+            decoded = pending.result() if pending is not None else pygame.image.load(path)
+            image = decoded.convert_alpha()
+        _images[path] = image
+    return image
+
+
+def forget(*paths):
+    '''Drop these from the cache, for artwork that is only needed while something is baked from it'''
+    for path in paths:
+        _images.pop(path, None)
+
@@ -0,0 +1,94 @@
+'''
+Segmented bar gauges drawn from one lit strip instead of one image per step.
+
+Every rpm or aux frame is the same bar with the first N segments lit, so all
+the dash needs is the unlit artwork (baked into the base layer, see
+layers.py), the lit artwork, and where each segment sits.  The segment table
+is measured from the artwork itself: wherever lit and unlit differ by more
+than threshold is a segment, stray specks spanning less than half the area of
+a segment are ignored.
+
+Showing a value is then two opaque copies - lit up to the edge, base from the
+edge on - and the edge can land part way into a segment, so the bar can move
+in steps finer than a segment without any new artwork.
+'''
+import pygame
+
+
+def find_segments(unlit, lit, vertical=False, threshold=40):
+    '''Rects of the segments that differ between two same sized surfaces, in the order they light up'''
+    same = pygame.mask.from_threshold(lit, (0, 0, 0, 0), (threshold, threshold, threshold, 255), othersurface=unlit)
+    same.invert()
+    rects = same.get_bounding_rects()
+    if not rects:
+        return []
+    largest = max(rect.width * rect.height for rect in rects)
+    rects = [rect for rect in rects if rect.width * rect.height * 2 >= largest]
+    #   One pixel of margin picks up the anti-aliased edges the threshold left out
+    bounds = unlit.get_rect()
+    rects = [rect.inflate(2, 2).clip(bounds) for rect in rects]
+    #   Horizontal bars light left to right, vertical ones bottom to top
+    if vertical:
+        return sorted(rects, key=lambda rect: -rect.bottom)
+    return sorted(rects, key=lambda rect: rect.left)
+
+
+class BarStrip:
+    '''
+    A bar gauge over base, which must already have the unlit artwork baked in at pos.
+    lit is the fully lit artwork, only its segments are kept - as one opaque patch of the base.
+    '''
+    def __init__(self, base, lit, pos, vertical=False, threshold=40):
+        area = lit.get_rect(topleft=pos).clip(base.get_rect())
+        unlit = base.subsurface(area)
+        on = unlit.copy()
+        on.blit(lit, (pos[0] - area.x, pos[1] - area.y))
+        segments = find_segments(unlit, on, vertical, threshold)
+        if not segments:
+            raise ValueError(f"lit artwork at {pos} shows no segments over the base")
+
+        #   Only the part of the screen the segments cover is kept and redrawn
+        local = segments[0].unionall(segments[1:])
+        self.rect = local.move(area.topleft)
+        self.unlit = base.subsurface(self.rect)
+        self.lit = self.unlit.copy()
+        for segment in segments:
+            self.lit.blit(on, segment.move(-local.x, -local.y), segment)
+        self.lit = self.lit.convert()
+        self.vertical = vertical
+
+        #   Segment table - (start, end) of every segment along the bar in patch pixels, in the
+        #   direction it grows (vertical bars count upwards from the bottom of the patch)
+        if vertical:
+            self.spans = [(local.bottom - s.bottom, local.bottom - s.top) for s in segments]
+        else:
+            self.spans = [(s.left - local.left, s.right - local.left) for s in segments]
+        self.length = local.height if vertical else local.width
+
+    def __len__(self):
+        return len(self.spans)
+
+    def extent(self, level):
+        '''How many pixels of the patch are lit for level segments, fractions light part of a segment'''
+        if level <= 0:
+            return 0
+        whole = int(level)
+        if whole >= len(self.spans):
+            return self.length
+        if level == whole:
+            return self.spans[whole - 1][1]
+        start, end = self.spans[whole]
+        return int(start + (end - start) * (level - whole))
+
+    def draw(self, screen, extent):
+        '''Lit for the first extent pixels, unlit for the rest - two opaque copies covering self.rect'''
+        x, y = self.rect.topleft
+        width, height = self.rect.size
+        if self.vertical:
+            edge = height - extent
+            screen.blit(self.unlit, (x, y), (0, 0, width, edge))
+            screen.blit(self.lit, (x, y + edge), (0, edge, width, extent))
+        else:
+            screen.blit(self.lit, (x, y), (0, 0, extent, height))
+            screen.blit(self.unlit, (x + extent, y), (extent, 0, width - extent, height))
+        return self.rect
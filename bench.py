@@ -0,0 +1,196 @@
+'''
+Headless render benchmark for the dash.
+
+Runs draw_digifiz() under SDL's dummy video driver while feeding scripted
+telemetry (rpm sweeps, blinkers, speed and fuel changing) and reports frame
+times as p50/p95/p99/max, a per-element breakdown and memory allocated per
+frame.  Results go to a JSON file so runs on two commits can be compared:
+
+    python bench.py --frames 1200 --out before.json
+    python bench.py --frames 1200 --out after.json --compare before.json
+'''
+import os
+
+#   Must be set before pygame is imported anywhere (main.py opens the window on import)
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+import pygame
+import main as dash
+from telemetry import *
+
+SIM_FPS = 60
+
+
+def percentiles(samples):
+    '''p50/p95/p99/max/mean of a list of nanosecond timings, in milliseconds'''
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    last = len(ordered) - 1
+
+    def pick(p):
+        return ordered[min(last, int(round(p / 100.0 * last)))] / 1e6
+
+    return {
+        "p50": pick(50),
+        "p95": pick(95),
+        "p99": pick(99),
+        "max": ordered[-1] / 1e6,
+        "mean": sum(ordered) / len(ordered) / 1e6,
+    }
+
+
+def script(frame):
+    '''Scripted telemetry for one simulated frame, (slot, value) pairs'''
+    t = frame / SIM_FPS
+    #   RPM sweeps 800 -> 5000 -> 800 every 4 seconds
+    phase = (t % 4.0) / 2.0
+    rpm = 800 + 4200 * (phase if phase <= 1 else 2 - phase)
+    blink = int(t * 1.5 * 2) % 2
+    return (
+        (RPM, round(rpm / 100) * 100),
+        (COOLANT, min(19, int(t / 2))),
+        (BOOST, int(rpm / 5000 * 19)),
+        (OILPRESSURE, 10 + blink),
+        (EGT, int(rpm / 5000 * 15)),
+        (SPEED, int(t * 3) % 140),
+        (FUEL, max(0.0, 45.0 - t * 0.5)),
+        (OUTSIDE_TEMP, 21),
+        (LEFTTURN, blink),
+        (HIGHBEAM, int(t / 5) % 2),
+    )
+
+
+def instrument(renderer, timings):
+    '''Wrap every element's draw so its time lands in timings[name]'''
+    clock = time.perf_counter_ns
+
+    for element in renderer.elements:
+        def timed(screen, value, draw=element.draw, bucket=timings[element.name]):
+            start = clock()
+            rect = draw(screen, value)
+            bucket.append(clock() - start)
+            return rect
+        element.draw = timed
+
+
+def run(frames, warmup):
+    clock = time.perf_counter_ns
+    store = dash.telemetry
+
+    #   First frame paints everything, keep it out of the numbers.
+    #   Frames are drawn back to back but the bars move on simulated time, SIM_FPS frames a second
+    pygame.display.update(dash.draw_digifiz(0.0))
+    for frame in range(warmup):
+        store.set_many(script(frame))
+        pygame.display.update(dash.draw_digifiz(frame / SIM_FPS))
+
+    timings = defaultdict(list)
+    instrument(dash.renderer, timings)
+    frame_times = []
+    rect_counts = []
+    for frame in range(warmup, warmup + frames):
+        store.set_many(script(frame))
+        start = clock()
+        rects = dash.draw_digifiz(frame / SIM_FPS)
+        pygame.display.update(rects)
+        frame_times.append(clock() - start)
+        rect_counts.append(len(rects))
+
+    #   Separate pass for memory, tracemalloc slows everything down
+    tracemalloc.start()
+    blocks = []
+    peaks = []
+    for frame in range(warmup + frames, warmup + frames + min(frames, 300)):
+        store.set_many(script(frame))
+        before_blocks = sys.getallocatedblocks()
+        before, _ = tracemalloc.get_traced_memory()
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        pygame.display.update(dash.draw_digifiz(frame / SIM_FPS))
+        _, peak = tracemalloc.get_traced_memory()
+        blocks.append(sys.getallocatedblocks() - before_blocks)
+        peaks.append(peak - before)
+    tracemalloc.stop()
+
+    total = sum(frame_times)
+    return {
+        "frames": frames,
+        "frame_ms": percentiles(frame_times),
+        "fps_capacity": frames / (total / 1e9) if total else None,
+        "rects_per_frame": sum(rect_counts) / len(rect_counts),
+        "elements_ms": {name: dict(percentiles(samples), calls=len(samples))
+                        for name, samples in sorted(timings.items())},
+        "alloc_per_frame": {
+            "net_blocks": sum(blocks) / len(blocks),
+            "peak_bytes": sum(peaks) / len(peaks),
+        },
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(result, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"[BENCH] vs {baseline_path} ({baseline.get('commit')})")
+    for key in ("p50", "p95", "p99", "max"):
+        old = baseline["frame_ms"].get(key)
+        new = result["frame_ms"].get(key)
+        if old:
+            print(f"    {key:>4}: {old:8.3f} -> {new:8.3f} ms  ({(new - old) / old * 100:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless draw_digifiz benchmark")
+    parser.add_argument("--frames", type=int, default=1200, help="measured frames")
+    parser.add_argument("--warmup", type=int, default=60, help="frames run before measuring")
+    parser.add_argument("--out", default="bench_results.json", help="where to write the JSON results")
+    parser.add_argument("--compare", help="previous results JSON to diff against")
+    args = parser.parse_args()
+
+    result = run(args.frames, args.warmup)
+    result.update({
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "machine": platform.machine(),
+        "video_driver": os.environ.get("SDL_VIDEODRIVER"),
+    })
+
+    with open(args.out, "w") as f:
+        json.dump(result, f, indent=2)
+
+    frame_ms = result["frame_ms"]
+    print(f"[BENCH] {args.frames} frames  p50 {frame_ms['p50']:.3f}  p95 {frame_ms['p95']:.3f}  "
+          f"p99 {frame_ms['p99']:.3f}  max {frame_ms['max']:.3f} ms")
+    for name, stats in result["elements_ms"].items():
+        if not stats["calls"]:
+            continue
+        print(f"    {name:<12} p50 {stats['p50']:.3f}  p99 {stats['p99']:.3f} ms  ({stats['calls']} draws)")
+    print(f"[BENCH] allocations/frame: {result['alloc_per_frame']}")
+    print(f"[BENCH] written to {args.out}")
+    if args.compare:
+        compare(result, args.compare)
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+'''
+Prebaked image bundle - every dash image as raw pixels in one file.
+
+Booting from PNGs means inflating ~100 files on every start, which is most of
+the start up time on a Pi.  bake() does that once, offline, and writes the
+pixels out already in the display's 32 bit format.  At start up the bundle is
+memory mapped and each image becomes a surface straight on top of the mapped
+pages (pygame.image.frombuffer) - no zlib, no copy, and the kernel only reads
+the pages a frame actually touches.
+
+File layout (all little endian):
+
+    header      "DGFZBNDL", u32 version, u32 index length
+    index       utf-8 JSON, see below
+    pixels      one block per image, each starting on a 64 byte boundary
+
+    index       {"format": "BGRA", "sources": {path: [mtime_ns, size]}, "images": {path: [offset, w, h]}}
+
+The index remembers the mtime and size of every source PNG.  AssetBundle.open()
+refuses a bundle whose sources have changed since it was baked, the dash then
+falls back to the PNGs and bakes a fresh one in the background (see assets.py).
+
+    python bundle.py            bake images/dash.bundle from the images of the dash's layout
+'''
+import json
+import mmap
+import os
+import struct
+
+import pygame
+
+MAGIC = b"DGFZBNDL"
+VERSION = 1
+HEADER = struct.Struct("<8sII")
+ALIGN = 64
+
+#   What convert_alpha() gives on a little endian ARGB8888 display, i.e. the Pi and most desktops
+DEFAULT_FORMAT = "BGRA"
+
+
+def _aligned(offset):
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+def source_stamp(path):
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def display_format():
+    '''frombuffer() format matching the open display's convert_alpha(), None when it has no match'''
+    screen = pygame.display.get_surface()
+    if screen is None or screen.get_bitsize() != 32:
+        return None
+    rmask, gmask, bmask, _ = screen.get_masks()
+    return {(0xFF0000, 0xFF00, 0xFF): "BGRA",
+            (0xFF, 0xFF00, 0xFF0000): "RGBA"}.get((rmask, gmask, bmask))
+
+
+def bake(paths, out, fmt=DEFAULT_FORMAT):
+    '''
+    Write the images in paths to the bundle out, returns the bundle's size in bytes.
+    Written to a temporary file and renamed, so a running dash mapping the old bundle is never disturbed.
+    '''
+    sources = {}
+    images = {}
+    blocks = []
+    offset = 0
+    for path in paths:
+        if path in images:
+            continue
+        #   Stamp before reading, an edit landing during the bake then shows up as stale next time
+        sources[path] = source_stamp(path)
+        surface = pygame.image.load(path)
+        pixels = pygame.image.tobytes(surface, fmt)
+        offset = _aligned(offset)
+        images[path] = [offset, surface.get_width(), surface.get_height()]
+        blocks.append((offset, pixels))
+        offset += len(pixels)
+
+    index = json.dumps({"format": fmt, "sources": sources, "images": images}).encode()
+    base = _aligned(HEADER.size + len(index))
+    temp = out + ".tmp"
+    with open(temp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(index)))
+        f.write(index)
+        for block_offset, pixels in blocks:
+            f.seek(base + block_offset)
+            f.write(pixels)
+        size = f.tell()
+    os.replace(temp, out)
+    return size
+
+
+class AssetBundle:
+    '''A mapped bundle, surface(path) hands out zero copy surfaces'''
+    def __init__(self, path, fmt, images, data):
+        self.path = path
+        self.format = fmt
+        self.images = images
+        self.data = data    # memoryview of the mapped file, the surfaces point into it
+
+    @classmethod
+    def open(cls, path, fmt=None):
+        '''
+        Map the bundle at path, None when it is missing, unreadable, baked for another
+        pixel format or any of its source PNGs has changed since.
+        '''
+        try:
+            with open(path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        try:
+            magic, version, index_length = HEADER.unpack_from(mapped)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"not a version {VERSION} bundle")
+            index = json.loads(bytes(mapped[HEADER.size:HEADER.size + index_length]))
+        except (struct.error, ValueError) as e:
+            print(f"[ASSETS] Ignoring {path}: {e}")
+            return None
+        if fmt is not None and index["format"] != fmt:
+            print(f"[ASSETS] {path} was baked as {index['format']}, the display wants {fmt}")
+            return None
+        for source, stamp in index["sources"].items():
+            try:
+                if source_stamp(source) != stamp:
+                    print(f"[ASSETS] {source} changed since {path} was baked")
+                    return None
+            except OSError:
+                print(f"[ASSETS] {source} is gone since {path} was baked")
+                return None
+        base = _aligned(HEADER.size + index_length)
+        return cls(path, index["format"], index["images"], memoryview(mapped)[base:])
+
+    def __contains__(self, path):
+        return path in self.images
+
+    def surface(self, path):
+        offset, width, height = self.images[path]
+        return pygame.image.frombuffer(self.data[offset:offset + width * height * 4], (width, height), self.format)
+
+
+def main():
+    import argparse
+    from constants import BUNDLE, LAYOUT
+    from layout import load_layout, image_paths
+
+    parser = argparse.ArgumentParser(description="Bake the dash images into one raw pixel bundle")
+    parser.add_argument("--layout", default=LAYOUT, help="layout file whose images are baked")
+    parser.add_argument("--out", default=BUNDLE)
+    parser.add_argument("--format", default=DEFAULT_FORMAT, choices=("BGRA", "RGBA"),
+                        help="byte order of the display's 32 bit pixels (default %(default)s)")
+    args = parser.parse_args()
+
+    paths = image_paths(load_layout(args.layout))
+    size = bake(paths, args.out, args.format)
+    print(f"[ASSETS] Baked {len(paths)} images into {args.out}, {size / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+'''
+Channel table for the dash - which MQTT topic feeds which telemetry slot,
+and how the payload is turned into the value the gauge shows.
+
+Adding a gauge is a new row in CHANNEL_TABLE.  Scaling and rounding for the
+bar gauges is baked into a lookup table when the row is built, so handling a
+message is a dict lookup, a parse and an array index.
+'''
+import math
+
+from telemetry import *
+
+
+class Channel:
+    '''
+    One row of the channel table.
+    parser turns the raw payload bytes into a number, the result is clamped to lo..hi.
+    If scale or step are set, round(value * scale / step) * step is precomputed for every
+    whole number in lo..hi so the conversion is a table lookup.
+    '''
+    __slots__ = ("topic", "slot", "parser", "scale", "step", "lo", "hi", "lut")
+
+    def __init__(self, topic, slot, parser=float, scale=1, step=1, lo=None, hi=None):
+        self.topic = topic
+        self.slot = slot
+        self.parser = parser
+        self.scale = scale
+        self.step = step
+        self.lo = lo
+        self.hi = hi
+        self.lut = None
+        if (scale != 1 or step != 1) and lo is not None and hi is not None:
+            self.lut = [round(value * scale / step) * step for value in range(lo, hi + 1)]
+
+    def convert(self, payload):
+        '''bytes straight off the wire -> value for the telemetry store, raises ValueError on junk'''
+        value = self.parser(payload)
+        #   float() takes "nan" and "inf", and an ECU float32 can be either - no gauge can show them
+        if not math.isfinite(value):
+            raise ValueError(f"not a finite number: {value}")
+        if self.lo is not None and value < self.lo:
+            value = self.lo
+        elif self.hi is not None and value > self.hi:
+            value = self.hi
+        if self.lut is not None:
+            return self.lut[int(round(value)) - self.lo]
+        return value
+
+
+#   Aux gauges have 20 frames (0-19), so scale maps the sensor range onto 19 steps.
+#   rpm isn't rounded here, the bar rounds it to the resolution its layout asks for
+CHANNEL_TABLE = (
+    #       topic                           slot            parser  scale       step    lo      hi
+    Channel("engine/rpm/state",             RPM,            float,  lo=0,   hi=5000),
+    Channel("engine/coolant/state",         COOLANT,        float,  19 / 120,   1,      0,      120),
+    Channel("engine/egt/state",             EGT,            float,  1,          1,      0,      19),
+    Channel("engine/oilpressure/state",     OILPRESSURE,    float,  1,          1,      0,      19),
+    Channel("engine/boost/state",           BOOST,          float,  19 / 100,   1,      0,      100),
+    Channel("engine/fuel/state",            FUEL,           float),
+    Channel("cabin/outside_temp/state",     OUTSIDE_TEMP,   float),
+    Channel("cabin/speed_cv/state",         SPEED,          float,  lo=0),
+    Channel("cabin/speed_gps/state",        SPEED_GPS,      float,  lo=0),
+    Channel("indicator/illumination/state", ILLUMINATION,   float,  lo=0,   hi=1),
+    Channel("indicator/foglight/state",     FOGLIGHT,       float,  lo=0,   hi=1),
+    Channel("indicator/defog/state",        DEFOG,          float,  lo=0,   hi=1),
+    Channel("indicator/highbeam/state",     HIGHBEAM,       float,  lo=0,   hi=1),
+    Channel("indicator/leftturn/state",     LEFTTURN,       float,  lo=0,   hi=1),
+    Channel("indicator/rightturn/state",    RIGHTTURN,      float,  lo=0,   hi=1),
+    Channel("indicator/brakewarn/state",    BRAKEWARN,      float,  lo=0,   hi=1),
+    Channel("indicator/oillight/state",     OILLIGHT,       float,  lo=0,   hi=1),
+    Channel("indicator/alt/state",          ALT,            float,  lo=0,   hi=1),
+    Channel("indicator/glow/state",         GLOW,           float,  lo=0,   hi=1),
+)
+
+
+class ChannelDispatcher:
+    '''
+    The single paho on_message for the dash, and the subscriber on the in-process telemetry bus.
+    hooks is {slot: function(value)} for anything else that wants a channel, e.g. the odometer.
+    '''
+    def __init__(self, store, table=CHANNEL_TABLE, hooks=None):
+        self.store = store
+        self.by_topic = {channel.topic: channel for channel in table}
+        self.hooks = hooks or {}
+        self.skipped = set()
+        self.mirror = None  # telemetry_bus.MqttMirror, its echoes from the broker are dropped when set
+        self.recorder = None  # recorder.Recorder, gets every decoded update when set
+        self.tracer = None  # latency.LatencyTracer, stamps every store write when set
+
+    def subscribe(self, client):
+        '''Only ask the broker for the topics in the table, minus the ones left to something else'''
+        topics = [(topic, 0) for topic in self.by_topic if topic not in self.skipped]
+        if topics:
+            client.subscribe(topics)
+
+    def attach_bus(self, bus, topics, mirror=None):
+        '''
+        Also take these topics from the in-process bus.  They stay subscribed on MQTT for other publishers,
+        pass the bus's MqttMirror as mirror so its copies of the bus values aren't received a second time.
+        '''
+        for topic in topics:
+            if topic in self.by_topic:
+                bus.subscribe(topic, self.dispatch)
+        self.mirror = mirror
+
+    def skip(self, topics):
+        '''Leave these topics to something else (the ingest process), neither subscribe to them nor dispatch them'''
+        self.skipped.update(topic for topic in topics if topic in self.by_topic)
+
+    def dispatch(self, topic, payload):
+        '''payload is raw bytes from MQTT or a number from the bus, the parser takes either'''
+        channel = self.by_topic.get(topic)
+        if channel is None:
+            return
+        try:
+            value = channel.convert(payload)
+        except ValueError:
+            print(f"[DASH] Bad payload on {topic}: {payload!r}")
+            return
+        self.store.set(channel.slot, value)
+        if self.tracer is not None:
+            self.tracer.mark_dispatch(topic, channel.slot)
+        if self.recorder is not None:
+            self.recorder.record_value(channel.slot, value)
+        hook = self.hooks.get(channel.slot)
+        if hook is not None:
+            hook(value)
+
+    def on_message(self, client, userdata, message):
+        topic = message.topic
+        if topic in self.skipped:
+            return
+        mirror = self.mirror
+        if mirror is not None and mirror.is_echo(topic, message.payload):
+            return  # our own bus value mirrored back by the broker, already had it
+        self.dispatch(topic, message.payload)
@@ -0,0 +1,161 @@
+"""
+asyncio session layer for the ECU link.
+
+The threaded path (MEITE.start_ack_loop + read_frames in a bridge thread)
+parks one thread in a 1 s serial read and another in a 1 s sleep, and
+neither can be stopped until its timeout runs out.  Here one event loop
+does it all:
+
+    reads       the port's file descriptor is registered with the loop, bytes
+                are read the moment they arrive and never blocked on
+    ACKs        a task that writes one and sleeps ack_interval, on the loop
+    shutdown    cancelling the session (or the runner) removes the reader,
+                cancels the ACK task and closes the port, straight away
+
+SessionRunner puts one loop on one thread and can drive any number of
+sessions, or other coroutines, side by side.
+
+    runner = SessionRunner()
+    runner.start()
+    runner.submit(bridge.run())     # SerialToMQTT.run wraps a MEITESession
+    ...
+    runner.stop()
+"""
+import asyncio
+import os
+import threading
+
+
+class MEITESession:
+    """
+    One ECU link.  on_frame(frame) is called on the loop for every complete frame
+    (a memoryview, valid only during the call - same as MEITE.read_frames).
+    Ports without a file descriptor (ReplaySerial) are polled every poll_interval instead.
+    """
+    def __init__(self, ecu, on_frame, ack_interval=1.0, poll_interval=0.005):
+        self.ecu = ecu
+        self.on_frame = on_frame
+        self.ack_interval = ack_interval
+        self.poll_interval = poll_interval
+        self.done = None
+
+    async def run(self):
+        """Connect, start reporting and deliver frames until cancelled or the port fails"""
+        loop = asyncio.get_running_loop()
+        ecu = self.ecu
+        ecu.connect()
+        ecu.running = True
+        self.done = loop.create_future()
+
+        fd = self._fileno(ecu.ser)
+        tasks = []
+        if fd is not None:
+            loop.add_reader(fd, self._readable, fd)
+        else:
+            tasks.append(asyncio.ensure_future(self._poll()))
+        try:
+            ecu.start_reporting()
+            tasks.append(asyncio.ensure_future(self._ack_loop()))
+            await self.done
+        finally:
+            if fd is not None:
+                loop.remove_reader(fd)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            ecu.stop()
+
+    def stop(self):
+        """End run() normally, call on the loop's thread"""
+        if self.done is not None and not self.done.done():
+            self.done.set_result(None)
+
+    @staticmethod
+    def _fileno(ser):
+        try:
+            return ser.fileno()
+        except (AttributeError, OSError, ValueError):
+            return None
+
+    def _fail(self, error):
+        print(f"[SESSION] ECU link lost: {error}")
+        if self.done is not None and not self.done.done():
+            self.done.set_exception(error)
+
+    def _readable(self, fd):
+        try:
+            data = os.read(fd, 1 << 16)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            self._fail(e)
+            return
+        if not data:
+            self._fail(EOFError("port closed"))
+            return
+        self._deliver(data)
+
+    def _deliver(self, data):
+        on_frame = self.on_frame
+        try:
+            for frame in self.ecu.frames_from(data):
+                on_frame(frame)
+        except Exception as e:
+            self._fail(e)
+
+    async def _poll(self):
+        ser = self.ecu.ser
+        while True:
+            waiting = ser.in_waiting
+            if waiting:
+                self._deliver(ser.read(waiting))
+                await asyncio.sleep(0)  # let the other tasks on the loop in between chunks
+            else:
+                await asyncio.sleep(self.poll_interval)
+
+    async def _ack_loop(self):
+        while True:
+            self.ecu.send_ack()
+            await asyncio.sleep(self.ack_interval)
+
+
+class SessionRunner:
+    """One event loop on one thread, for every ECU session and anything else that wants it"""
+    def __init__(self, name="ecu-io"):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def start(self):
+        self.thread.start()
+
+    def submit(self, coro):
+        """Schedule a coroutine on the loop from any thread, returns a concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(self._guard(coro), self.loop)
+
+    @staticmethod
+    async def _guard(coro):
+        try:
+            return await coro
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[SESSION] {type(e).__name__}: {e}")
+
+    async def _cancel_all(self):
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stop(self, timeout=5.0):
+        """Cancel everything on the loop, wait for the clean up to finish and close the loop"""
+        if not self.thread.is_alive():
+            return
+        asyncio.run_coroutine_threadsafe(self._cancel_all(), self.loop).result(timeout)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout)
+        self.loop.close()
@@ -0,0 +1,251 @@
+'''
+Simulated ME221 on a Linux pseudo-terminal.
+
+MEITE opens the pty's slave end exactly like the real USB serial port.  The
+simulator waits for the start reporting request, answers with a channel
+definition (class 0, msg 2), swallows the ACKs and then streams live data
+frames (msg 0) at whatever rate is asked for - a pty has no baud rate, so
+this goes far past what 115200 baud allows.  It can also throw in line
+noise and split frames across writes.
+
+    python ecu_sim.py --rate 200 --channels 40           # prints the port to point MEITE at
+    python ecu_sim.py --load-test 10 --rate 2000 --noise 0.01 --partial 0.2
+'''
+import argparse
+import os
+import random
+import select
+import struct
+import threading
+import time
+import tty
+from array import array
+
+from meite import MEITEFramer
+
+# (data id, type code) - see CHANNEL_NAMES / TYPE_MAP in meite_decoder.py
+DASH_CHANNELS = [
+    (1, 2),     # RPM, uint16 - carries the frame sequence number in load tests
+    (14, 0),    # Coolant Temp. – Deg. Celsius, float32
+    (6, 2),     # MAP – KPa, uint16
+    (18, 0),    # Batter Voltage – Volts, float32
+    (4, 0),     # Injector Duty - %, float32
+    (12, 0),    # O2 Val – Volts, float32
+    (8, 0),     # TPS - %, float32
+    (85, 4),    # Vehicle Speed, uint8
+]
+TYPE_CODES = {0: "f", 1: "h", 2: "H", 3: "b", 4: "B", 5: "?"}
+
+REPORTING_CLASS = 0
+MSG_DATA = 0
+MSG_ACK = 1
+MSG_DEFINITION = 2
+
+
+def checksum(body):
+    '''Two running byte sums over type, class, msg id and payload, as the ECU sends them'''
+    a = b = 0
+    for byte in body:
+        a = (a + byte) & 0xFF
+        b = (b + a) & 0xFF
+    return bytes((a, b))
+
+
+def build_frame(msg_type, class_id, msg_id, payload):
+    body = bytes((msg_type, class_id, msg_id)) + payload
+    return b"ME" + struct.pack("<H", len(payload)) + body + checksum(body)
+
+
+class ECUSimulator:
+    def __init__(self, rate=50.0, channels=len(DASH_CHANNELS), noise=0.0, partial=0.0, seed=None):
+        self.rate = rate
+        self.noise = noise        # chance of garbage bytes ahead of a frame
+        self.partial = partial    # chance of a frame being split over two writes
+        self.random = random.Random(seed)
+        self.channels = list(DASH_CHANNELS[:channels])
+        # Pad out with the rest of the ECU's channels as uint16s
+        data_id = 20
+        while len(self.channels) < channels:
+            if data_id not in dict(self.channels):
+                self.channels.append((data_id, 2))
+            data_id += 1
+        self.record = struct.Struct("<B" + "".join(TYPE_CODES[dtype] for _, dtype in self.channels))
+
+        self.master = None
+        self.slave = None
+        self.port = None
+        self.thread = None
+        self.running = False
+        self.reporting = False
+        self.framer = MEITEFramer()
+        self.sequence = 0
+        self.sent_at = array("d", bytes(8 * 65536))  # send time by sequence, for latency checks
+        self.frames_sent = 0
+        self.acks = 0
+
+    def open(self):
+        '''Create the pty, returns the device path to hand to MEITE'''
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+        print(f"[SIM] ME221 simulator on {self.port}")
+        return self.port
+
+    def start(self):
+        if self.master is None:
+            self.open()
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+        for fd in (self.master, self.slave):
+            if fd is not None:
+                os.close(fd)
+        self.master = self.slave = None
+        print(f"[SIM] Stopped after {self.frames_sent} frames, {self.acks} ACKs")
+
+    def definition(self):
+        payload = bytes([0]) + struct.pack("<H", len(self.channels))
+        payload += b"".join(struct.pack("<HB", data_id, dtype) for data_id, dtype in self.channels)
+        return build_frame(0, REPORTING_CLASS, MSG_DEFINITION, payload)
+
+    def data(self):
+        '''One live data frame, the RPM slot carries the sequence number'''
+        t = time.monotonic()
+        values = [0]
+        for data_id, dtype in self.channels:
+            if data_id == 1:
+                values.append(self.sequence)
+            elif dtype == 0:
+                values.append(50.0 + 40.0 * ((t * 0.1) % 1.0))
+            elif dtype == 5:
+                values.append(bool(self.sequence & 1))
+            elif dtype in (3, 1):
+                values.append(self.sequence % 100)
+            else:
+                values.append(self.sequence % 200)
+        return build_frame(0, REPORTING_CLASS, MSG_DATA, self.record.pack(*values))
+
+    def _handle(self, frame):
+        class_id, msg_id = frame[5], frame[6]
+        if class_id != REPORTING_CLASS:
+            return
+        if msg_id == MSG_DEFINITION:
+            # Start reporting request
+            self._write(self.definition())
+            self.reporting = True
+        elif msg_id == MSG_ACK:
+            self.acks += 1
+
+    def _write(self, frame):
+        if self.noise and self.random.random() < self.noise:
+            os.write(self.master, bytes(self.random.getrandbits(8) for _ in range(self.random.randint(1, 16))))
+        if self.partial and self.random.random() < self.partial and len(frame) > 1:
+            cut = self.random.randint(1, len(frame) - 1)
+            os.write(self.master, frame[:cut])
+            os.write(self.master, frame[cut:])
+        else:
+            os.write(self.master, frame)
+
+    def _run(self):
+        interval = 1.0 / self.rate if self.rate else 0.0
+        next_due = time.monotonic()
+        while self.running:
+            now = time.monotonic()
+            wait = max(0.0, next_due - now) if self.reporting else 0.1
+            readable, _, _ = select.select([self.master], [], [], min(wait, 0.1))
+            if readable:
+                try:
+                    incoming = os.read(self.master, 4096)
+                except OSError:
+                    incoming = b""
+                for frame in self.framer.push(incoming):
+                    self._handle(frame)
+            if not self.reporting:
+                continue
+            now = time.monotonic()
+            # Catch up in a burst if we fell behind, like a busy ECU would
+            while now >= next_due and self.running:
+                self.sequence = (self.sequence + 1) & 0xFFFF
+                self.sent_at[self.sequence] = time.monotonic()
+                self._write(self.data())
+                self.frames_sent += 1
+                next_due += interval
+                if interval == 0.0:
+                    break
+
+
+def load_test(seconds, rate, channels, noise, partial):
+    '''Run the real ingest stack against the simulator and report throughput and latency'''
+    from ecu_session import SessionRunner
+    from serial_to_mqtt import SerialToMQTT
+    from publish_policy import PublishPolicy
+    from telemetry_bus import TelemetryBus
+
+    sim = ECUSimulator(rate=rate, channels=channels, noise=noise, partial=partial, seed=1)
+    port = sim.open()
+    sim.start()
+
+    latencies = []
+    strays = [0]
+    bus = TelemetryBus()
+
+    def on_rpm(topic, value):
+        latency = time.monotonic() - sim.sent_at[int(value) & 0xFFFF]
+        if 0 <= latency < 1.0:
+            latencies.append(latency)
+        else:
+            # Not a sequence number we just sent - a false sync turned into a "frame"
+            strays[0] += 1
+
+    bus.subscribe("engine/rpm/state", on_rpm)
+    # Every change goes through, no deadbands or rate caps in the way
+    bridge = SerialToMQTT(client=None, port=port, bus=bus, policy=PublishPolicy(keepalive=None))
+
+    sessions = SessionRunner()
+    sessions.start()
+    sessions.submit(bridge.run())
+    time.sleep(seconds)
+    sessions.stop()
+    sim.stop()
+
+    received = len(latencies)
+    print(f"[SIM] sent {sim.frames_sent} frames in {seconds} s ({sim.frames_sent / seconds:.0f}/s), "
+          f"received {received} ({received / max(sim.frames_sent, 1) * 100:.1f}%), {strays[0]} stray values")
+    if latencies:
+        latencies.sort()
+        pick = lambda p: latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000
+        print(f"[SIM] serial -> bus latency ms: p50 {pick(50):.3f}  p95 {pick(95):.3f}  "
+              f"p99 {pick(99):.3f}  max {latencies[-1] * 1000:.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated ME221 ECU on a pseudo-terminal")
+    parser.add_argument("--rate", type=float, default=50, help="data frames per second (0 = flat out)")
+    parser.add_argument("--channels", type=int, default=len(DASH_CHANNELS), help="channels per data frame")
+    parser.add_argument("--noise", type=float, default=0.0, help="chance of garbage ahead of a frame")
+    parser.add_argument("--partial", type=float, default=0.0, help="chance of a frame split over two writes")
+    parser.add_argument("--load-test", type=float, metavar="SECONDS",
+                        help="run SerialToMQTT against the simulator for this long and report")
+    args = parser.parse_args()
+
+    if args.load_test:
+        load_test(args.load_test, args.rate, args.channels, args.noise, args.partial)
+        return
+
+    sim = ECUSimulator(rate=args.rate, channels=args.channels, noise=args.noise, partial=args.partial)
+    sim.open()
+    sim.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        sim.stop()
+
+
+if __name__ == "__main__":
+    main()
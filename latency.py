@@ -0,0 +1,208 @@
+'''
+End-to-end latency tracing, from the serial read to the display update that
+first shows a value.
+
+Each stage stamps time.perf_counter_ns() as a value passes through it:
+
+    read        MEITE.read_frames got the bytes off the port
+    decode      MEITEDecoder unpacked the frame
+    publish     SerialToMQTT handed the value to the bus (or MQTT)
+    dispatch    ChannelDispatcher wrote it into the telemetry store
+    frame       draw_digifiz took the snapshot and set the gauge frames
+    display     pygame.display.update() returned
+
+The gaps between stages go into a histogram per dash channel.  A value that is
+overwritten before a frame picks it up is never displayed, so only the latest
+one per channel is traced.  Values that come in over MQTT from something other
+than the ECU bridge only have the dispatch stage onwards.
+
+Nothing is stamped unless the tracer is attached (MEITE.tracer,
+SerialToMQTT.tracer, ChannelDispatcher.tracer), see main().
+'''
+import json
+import threading
+import time
+
+import pygame
+
+from renderer import Element
+from telemetry import CHANNELS
+
+#   name, from stage, to stage - index into the stamps kept per channel
+READ, DECODE, PUBLISH, DISPATCH, FRAME, DISPLAY = range(6)
+SPANS = (
+    ("decode", READ, DECODE),
+    ("publish", DECODE, PUBLISH),
+    ("hop", PUBLISH, DISPATCH),       # bus callback, or the round trip through the broker
+    ("wait", DISPATCH, FRAME),        # sitting in the store until the next frame
+    ("draw", FRAME, DISPLAY),         # render + display.update
+    ("total", READ, DISPLAY),
+)
+NO_STAMPS = (0, 0, 0)
+
+
+class Histogram:
+    '''Power of two buckets from 16 us up, bucket n holds everything below 16 << n us'''
+    __slots__ = ("counts", "count", "total", "max")
+    BUCKETS = 20
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def add(self, ns):
+        us = ns // 1000
+        bucket = min(max(us.bit_length() - 4, 0), self.BUCKETS - 1)
+        self.counts[bucket] += 1
+        self.count += 1
+        self.total += ns
+        if ns > self.max:
+            self.max = ns
+
+    def percentile(self, p):
+        '''Upper edge of the bucket holding the p-th percentile, in ms'''
+        if not self.count:
+            return 0.0
+        wanted = self.count * p / 100
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= wanted:
+                return min((16 << bucket) / 1000, self.max / 1e6)
+        return self.max / 1e6
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count / 1e6 if self.count else 0.0,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.max / 1e6,
+            "buckets_us": {16 << bucket: count for bucket, count in enumerate(self.counts) if count},
+        }
+
+
+class LatencyTracer:
+    def __init__(self, channels=CHANNELS):
+        self.channels = channels
+        self.lock = threading.Lock()
+        self.read_at = 0        # bridge thread: the read the current frame came from
+        self.decode_at = 0
+        self.published = {}     # topic -> (read, decode, publish)
+        self.pending = {}       # slot -> [read, decode, publish, dispatch, frame]
+        self.histograms = {}    # channel name -> {span name: Histogram}
+
+    def mark_read(self):
+        self.read_at = time.perf_counter_ns()
+
+    def mark_decode(self):
+        self.decode_at = time.perf_counter_ns()
+
+    def mark_publish(self, topic):
+        self.published[topic] = (self.read_at, self.decode_at, time.perf_counter_ns())
+
+    def mark_dispatch(self, topic, slot):
+        stamps = [*self.published.get(topic, NO_STAMPS), time.perf_counter_ns(), 0]
+        with self.lock:
+            self.pending[slot] = stamps
+
+    def mark_frame(self):
+        '''Called just before the snapshot, so anything pending now is in this frame'''
+        if not self.pending:
+            return
+        now = time.perf_counter_ns()
+        with self.lock:
+            for stamps in self.pending.values():
+                if not stamps[FRAME]:
+                    stamps[FRAME] = now
+
+    def mark_display(self):
+        if not self.pending:
+            return
+        now = time.perf_counter_ns()
+        with self.lock:
+            shown = [(slot, stamps) for slot, stamps in self.pending.items() if stamps[FRAME]]
+            for slot, _ in shown:
+                del self.pending[slot]
+        for slot, stamps in shown:
+            stamps.append(now)
+            spans = self.histograms.get(self.channels[slot])
+            if spans is None:
+                spans = self.histograms[self.channels[slot]] = {name: Histogram() for name, _, _ in SPANS}
+            for name, start, end in SPANS:
+                if start == READ and not stamps[READ]:
+                    start = DISPATCH  # not from the ECU bridge, time it from the store
+                if stamps[start]:
+                    spans[name].add(stamps[end] - stamps[start])
+
+    def report(self):
+        return {channel: {name: histogram.as_dict() for name, histogram in spans.items()}
+                for channel, spans in self.histograms.items()}
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            json.dump({"written": time.time(), "channels": self.report()}, f, indent=2)
+        print(f"[LATENCY] Histograms written to {path}")
+
+
+class LatencyOverlay:
+    '''
+    Debug table of p50/p95 per channel and span, drawn on top of the dash.
+    Use element() as the last renderer element, toggle() shows and hides it.
+    '''
+    REFRESH = 1.0
+    COLOUR = (255, 255, 255)
+    BACKGROUND = (0, 0, 0)
+
+    def __init__(self, tracer, topleft=(20, 20), size=22):
+        self.tracer = tracer
+        self.topleft = topleft
+        self.size = size
+        self.font = None
+        self.visible = False
+        self.surface = None
+        self.built_at = 0.0
+
+    def element(self):
+        return Element("latency", self.draw, self.state)
+
+    def toggle(self):
+        self.visible = not self.visible
+        self.surface = None
+
+    def state(self, values):
+        '''Changes when the overlay is shown or hidden, and at most once a second while shown'''
+        if not self.visible:
+            return None
+        now = time.monotonic()
+        if self.surface is None or now - self.built_at >= self.REFRESH:
+            self.built_at = now
+            self.surface = self._build()
+        return self.surface
+
+    def _build(self):
+        if self.font is None:
+            pygame.font.init()
+            self.font = pygame.font.SysFont("dejavusansmono,monospace", self.size)
+        rows = ["channel".ljust(14) + "".join(name.rjust(14) for name, _, _ in SPANS) + "  (p50/p95 ms)"]
+        for channel, spans in sorted(self.tracer.histograms.items()):
+            rows.append(channel[:14].ljust(14) + "".join(
+                f"{spans[name].percentile(50):.2f}/{spans[name].percentile(95):.2f}".rjust(14)
+                for name, _, _ in SPANS))
+        if len(rows) == 1:
+            rows.append("no traced values yet")
+        lines = [self.font.render(row, True, self.COLOUR) for row in rows]
+        height = self.font.get_linesize()
+        surface = pygame.Surface((max(line.get_width() for line in lines) + 16, height * len(lines) + 16))
+        surface.fill(self.BACKGROUND)
+        for n, line in enumerate(lines):
+            surface.blit(line, (8, 8 + n * height))
+        return surface
+
+    def draw(self, screen, surface):
+        if surface is None:
+            return pygame.Rect(self.topleft, (0, 0))
+        return screen.blit(surface, self.topleft)
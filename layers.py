@@ -0,0 +1,38 @@
+'''
+Pre-composed layers for the dash.
+
+Everything that never changes (background, MFA panel) is flattened into one
+opaque base surface, so a full repaint or a patch restore is a plain copy
+instead of a per-pixel alpha blend.  Things that only flip between a few
+looks (indicators, the fuel reserve lamp) get every look baked over the base
+up front, and switching is one opaque copy of a small patch - nothing is
+alpha blended at run time except the gauges and readouts on top.
+'''
+
+
+def bake(background, *parts):
+    '''background with each (surface, pos) blitted on top, as one opaque surface in the display format'''
+    baked = background.copy()
+    for surface, pos in parts:
+        baked.blit(surface, pos)
+    return baked.convert()
+
+
+class Switch:
+    '''
+    A patch of the base with one baked look per state.
+    variants is {state: (surface, pos)}, surface None for "just the base".
+    '''
+    def __init__(self, base, variants):
+        rects = [surface.get_rect(topleft=pos) for surface, pos in variants.values() if surface is not None]
+        self.rect = rects[0].unionall(rects[1:]).clip(base.get_rect())
+        patch = base.subsurface(self.rect)
+        self.looks = {}
+        for state, (surface, pos) in variants.items():
+            if surface is None:
+                self.looks[state] = bake(patch)
+            else:
+                self.looks[state] = bake(patch, (surface, (pos[0] - self.rect.x, pos[1] - self.rect.y)))
+
+    def draw(self, screen, state):
+        return screen.blit(self.looks[state], self.rect)
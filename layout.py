@@ -0,0 +1,143 @@
+'''
+The dash layout, as data.
+
+layouts/*.json says what is on the dash and where: the background, static
+artwork baked under everything, and every widget with the telemetry channel it
+shows, the images it uses and its position.  compile_layout() turns that into
+a RenderPlan once at start up:
+
+    base        background + static artwork + unlit bars, one opaque surface
+    elements    renderer Elements, sorted back to front (by "z", then file order)
+    gauges      (bar gauge, telemetry slot) pairs for the per-frame smoothing
+
+Every image is loaded, every patch baked and every rect that can be known is
+worked out while compiling, so a frame is the renderer walking one flat list.
+Moving a widget, adding one or switching to another layout file is an edit to
+JSON, not to main.py.
+
+Widget types, with the keys each one takes besides name, type and an optional z:
+
+    rpm_bar     channel, pos, unlit, lit, segments, resolution (rpm), smoothing {attack, decay, horizon}
+    aux_bar     channel, pos, unlit, lit, segments, resolution (segments), smoothing
+    lamp        channel, pos, on, off (optional), and equals or at_most - lit while the value matches
+    readout     channel or source, size, colour, unlit (optional), digits (optional), anchor {rect position: [x, y]}
+
+Colours are [r, g, b] or the name of a colour in constants.py.  A readout's
+source is one of the named sources main.py passes in (e.g. the clock), and a
+channel value is shown as a whole number.
+'''
+import json
+
+import constants
+import assets
+from aux_gauge.AuxGauge import AuxGauge
+from layers import bake, Switch
+from readout import Readout
+from renderer import Element
+from rpm.rpm import RpmGauge
+from smoothing import Smoother
+from telemetry import SLOT
+
+BARS = {"rpm_bar": RpmGauge, "aux_bar": AuxGauge}
+IMAGES = {"rpm_bar": ("unlit", "lit"), "aux_bar": ("unlit", "lit"), "lamp": ("on", "off")}   # image keys per widget type
+
+
+def load_layout(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def image_paths(spec):
+    '''Every image the layout uses, background first - what gets prefetched and baked into the bundle'''
+    paths = [spec["background"]] + [part["image"] for part in spec.get("static", ())]
+    for widget in spec["widgets"]:
+        for key in IMAGES.get(widget["type"], ()):
+            if widget.get(key) and widget[key] not in paths:
+                paths.append(widget[key])
+    return paths
+
+
+def _slot(widget):
+    try:
+        return SLOT[widget["channel"]]
+    except KeyError:
+        raise ValueError(f"layout widget {widget['name']}: no telemetry channel {widget.get('channel')!r}") from None
+
+
+def _colour(value):
+    if value is None:
+        return None
+    return tuple(getattr(constants, value) if isinstance(value, str) else value)
+
+
+class RenderPlan:
+    def __init__(self, base, elements, gauges, widgets):
+        self.base = base
+        self.elements = elements
+        self.gauges = gauges
+        self.widgets = widgets      # name -> the gauge, Switch or Readout behind it
+
+
+def compile_layout(spec, background, sources=None):
+    '''
+    Build the RenderPlan for a layout.
+    background is the already loaded background surface, sources {name: function(values) -> text}
+    are the readout sources that aren't telemetry channels.
+    '''
+    sources = sources or {}
+    widgets = sorted(spec["widgets"], key=lambda widget: widget.get("z", 0))
+
+    #   Everything that never changes goes into the base first, the widgets are cut out of it after
+    parts = [(assets.load_image(part["image"]), tuple(part["pos"])) for part in spec.get("static", ())]
+    parts += [(assets.load_image(widget["unlit"]), tuple(widget["pos"])) for widget in widgets if widget["type"] in BARS]
+    base = bake(background, *parts)
+
+    elements = []
+    gauges = []
+    built = {}
+    for widget in widgets:
+        name, kind = widget["name"], widget["type"]
+        if kind in BARS:
+            smoother = Smoother(**widget.get("smoothing", {}))
+            options = {"resolution": widget["resolution"]} if "resolution" in widget else {}
+            gauge = BARS[kind](tuple(widget["pos"]), widget["segments"], base,
+                               assets.load_image(widget["lit"]), smoother, **options)
+            element = Element(name, lambda screen, lit, gauge=gauge: gauge.show(screen),
+                              lambda values, gauge=gauge: gauge.get_lit(), opaque=True)
+            gauges.append((gauge, _slot(widget)))
+            built[name] = gauge
+
+        elif kind == "lamp":
+            pos = tuple(widget["pos"])
+            off = assets.load_image(widget["off"]) if widget.get("off") else None
+            switch = Switch(base, {True: (assets.load_image(widget["on"]), pos), False: (off, pos)})
+            slot = _slot(widget)
+            if "at_most" in widget:
+                limit = widget["at_most"]
+                state = lambda values, slot=slot, limit=limit: values[slot] <= limit
+            else:
+                match = widget.get("equals", 1)
+                state = lambda values, slot=slot, match=match: values[slot] == match
+            element = Element(name, switch.draw, state, opaque=True)
+            built[name] = switch
+
+        elif kind == "readout":
+            readout = Readout(widget["size"], _colour(widget["colour"]), _colour(widget.get("unlit")),
+                              widget.get("digits", 0))
+            anchor = {position: tuple(xy) for position, xy in widget["anchor"].items()}
+            if "source" in widget:
+                state = sources[widget["source"]]
+            else:
+                slot = _slot(widget)
+                state = lambda values, slot=slot: str(int(values[slot]))
+            element = Element(name, lambda screen, text, readout=readout, anchor=anchor:
+                              readout.draw(screen, text, **anchor), state)
+            built[name] = readout
+
+        else:
+            raise ValueError(f"layout widget {name}: unknown type {kind!r}")
+        elements.append(element)
+
+    #   The bars keep only the segments they cut out, the full size artwork can go
+    assets.forget(*{widget[key] for widget in widgets if widget["type"] in BARS for key in ("unlit", "lit")})
+    return RenderPlan(base, elements, gauges, built)
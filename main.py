@@ -19,51 +19,73 @@
 """
 
 
+import os
+import time
 import pygame
-import threading
-import paho.mqtt.client as mqtt
 from datetime import datetime
-import paho.mqtt.client as mqttClient
-from rpm.rpm import RpmGauge
-from aux_gauge.AuxGauge import AuxGauge
+import assets
+from startup import PhaseTimer, open_window, show_background
+from layout import load_layout, image_paths
 from constants import *
-from variables import *
-from draw import *
-from meite import MEITE
-from serial_to_mqtt import SerialToMQTT
 
 #   Import pygame, for main graphics functions
 #   Date time is for the clock and perhaps MQTT
-#   Paho to handle the MQTT subscription from Node-Red
+#   Paho and the ECU side are only imported in main(), after the dash is already on screen
 
-# Setup Display
-pygame.init()
+#   Start up phases are timed and reported once the first frame is up
+startup = PhaseTimer()
 
-# Title and Icon
-pygame.display.set_icon(programIcon)
-pygame.display.set_caption(project_name + digifiz_ver)
+# Setup Display - the one and only window, title and icon
+WIN = open_window(project_name + digifiz_ver, ICON)
+startup.mark("window")
 
-# Font Information
-odo_font = pygame.font.Font(FONT_PATH, FONT_SMALL)
-digital_font = pygame.font.Font(FONT_PATH, FONT_MEDIUM)
-font_speedunits = pygame.font.Font(FONT_PATH, FONT_LARGE)
+#   What goes where on the dash, see layouts/ and layout.py
+dash_layout = load_layout(LAYOUT)
 
-# Setup Game Loop
-clock = pygame.time.Clock()
+#   Images come straight out of the prebaked bundle when it is current,
+#   anything else starts decoding on a thread pool now, background first
+layout_images = image_paths(dash_layout)
+bundled = assets.use_bundle(BUNDLE, layout_images)
+assets.prefetch(layout_images)
+BACKGROUND = show_background(WIN, dash_layout["background"])
+startup.mark("background")
 
-#   Create gauge instances from classes.
-boost = AuxGauge(BOOST_XY, 19)
-egt = AuxGauge(EGT_XY, 19)
-coolant = AuxGauge(COOLANT_XY, 19)
-oilpressure = AuxGauge(OILPRESSURE_XY, 19)
-rpm = RpmGauge(RPM_XY, 50)
+from telemetry import *
+from channels import ChannelDispatcher
+from telemetry_bus import TelemetryBus
+from renderer import Renderer
+from odometer import Odometer
+from layout import compile_layout
+from latency import LatencyTracer, LatencyOverlay
+from scheduler import FrameScheduler, every, next_minute
+startup.mark("imports")
 
+#   Every dash value lives here, written by the MQTT thread and read once per frame
+telemetry = TelemetryStore()
 
-#   Creating the list for the indicator gauges
-indicator_images = []
-for i in range(10):
-    image = pygame.image.load(("images/indicators/ind" + str(i) + ".png"))
-    indicator_images.append(image)
+#   Odometer and trip are loaded once, then kept in memory and saved now and then
+odometer = Odometer()
+
+#   MQTT topic -> telemetry slot, see CHANNEL_TABLE in channels.py
+dispatcher = ChannelDispatcher(telemetry, hooks={SPEED: odometer.update_speed})
+
+#   The ECU bridge runs in this process, its values reach the dash through this bus instead of the broker
+bus = TelemetryBus()
+
+#   Serial read -> display update timing per channel, only stamped once attached in main()
+tracer = LatencyTracer()
+latency_overlay = LatencyOverlay(tracer)
+
+#   Every widget in the layout, compiled once into the base layer and a back to front list of elements.
+#   Readouts that don't show a telemetry channel take their text from these
+plan = compile_layout(dash_layout, BACKGROUND, sources={
+    "clock": lambda values: datetime.now().strftime('%H:%M'),   # currently only 24hr
+    "odometer": lambda values: str(odometer.reading()),         # only redrawn when the whole number changes
+})
+
+#   Bar gauges and the telemetry slot that drives each of them
+gauge_slots = plan.gauges
+startup.mark("layout")
 
 
 ######
@@ -76,325 +98,165 @@ def on_connect(client, userdata, flags, rc):
         print("Connected to broker")
         global Connected  # Use global variable
         Connected = True  # Signal connection
-        client.subscribe("#")
+        dispatcher.subscribe(client)
     else: print("Connection failed")
 
 
-def on_message(client, userdata, message): print(message.topic + " " + message.payload.decode())
-
-
-######
-#       ENGINE TOPIC MQTT
-######
-
-def on_message_rpm(digi, obj, message):
-    rpm_mqtt = int((message.payload.decode()))
-    rounded_rpm = round(rpm_mqtt / 100) * 100
-    print(f"[DASH] RPM callback fired → {rounded_rpm}")
-    rpm.set_frame(rounded_rpm)
-
-
-def on_message_coolant(digi, obj, message):
-    coolant_mqtt = int((message.payload.decode()))
-    scaling_factor = 120/19
-    rounded_coolant = round(coolant_mqtt / scaling_factor)
-    print(f"[DASH] Coolant callback fired → {rounded_coolant}")
-    coolant.set_frame(rounded_coolant)
-
-
-def on_message_egt(digi, obj, message):
-    egt_mqtt = int((message.payload.decode()))
-    egt.set_frame(egt_mqtt)
-
-
-def on_message_oilpressure(digi, obj, message):
-    oilpressure_mqtt = int((message.payload.decode()))
-    oilpressure.set_frame(oilpressure_mqtt)
-
-
-def on_message_boost(digi, obj, message):
-    boost_mqtt = float((message.payload.decode()))
-    rounded_boost = round(boost_mqtt)
-    print(f"[DASH] Boost callback fired → {rounded_boost}")
-    scaling_factor = 100/19
-    boost_mqtt = round(rounded_boost / scaling_factor)
-    boost.set_frame(boost_mqtt)
-
-
-######
-#       CABIN TOPIC MQTT
-######
-
-def on_message_speed_cv(digi, obj, message):
-    global speed_status
-    speed_cv_mqtt = int((message.payload.decode()))
-    speed_status = speed_cv_mqtt
-
-
-def on_message_speed_gps(digi, obj, message):
-    global speed_gps_status
-    speed_gps_mqtt = int((message.payload.decode()))
-    speed_gps_status = speed_gps_mqtt
-
-
-def on_message_outside_temp(digi, obj, message):
-    global outside_temp_status
-    outside_temp_mqtt = int((message.payload.decode()))
-    outside_temp_status = outside_temp_mqtt
-
-
-def on_message_fuel(digi, obj, message):
-    global fuel_status
-    fuel_mqtt = float((message.payload.decode()))
-    fuel_status = fuel_mqtt
-
-
-######
-#       INDICATOR TOPIC MQTT
-######
-
-def on_message_illumination(digi, obj, message):
-    global illumination_state
-    illumination_mqtt = int((message.payload.decode()))
-    illumination_state = illumination_mqtt
-
-
-def on_message_foglight(digi, obj, message):
-    global foglight_state
-    foglight_mqtt = int((message.payload.decode()))
-    foglight_state = foglight_mqtt
-
-
-def on_message_defog(digi, obj, message):
-    global defog_state
-    defog_mqtt = int((message.payload.decode()))
-    defog_state = defog_mqtt
-
+#   Main Drawings for the program - the base layer, then the layout's elements back to front
+renderer = Renderer(WIN, plan.base)
+for element in plan.elements:
+    renderer.add(element)
+renderer.add(latency_overlay.element())
 
-def on_message_highbeam(digi, obj, message):
-    global highbeam_state
-    highbeam_mqtt = int((message.payload.decode()))
-    highbeam_state = highbeam_mqtt
+#   Frames are drawn when telemetry changes, a timer comes due or something is still moving - see scheduler.py
+scheduler = FrameScheduler(telemetry.wake, max_fps=FPS, idle_fps=IDLE_FPS)
+scheduler.add_timer(next_minute)
+scheduler.add_timer(every(LatencyOverlay.REFRESH, lambda: latency_overlay.visible))
 
 
-def on_message_leftturn(digi, obj, message):
-    global leftturn_state
-    leftturn_mqtt = int((message.payload.decode()))
-    leftturn_state = leftturn_mqtt
-
-
-def on_message_rightturn(digi, obj, message):
-    global rightturn_state
-    rightturn_mqtt = int((message.payload.decode()))
-    rightturn_state = rightturn_mqtt
-
-
-def on_message_brakewarn(digi, obj, message):
-    global brakewarn_state
-    brakewarn_mqtt = int((message.payload.decode()))
-    brakewarn_state = brakewarn_mqtt
-
-
-def on_message_oillight(digi, obj, message):
-    global oillight_state
-    oillight_mqtt = int((message.payload.decode()))
-    oillight_state = oillight_mqtt
-
-
-def on_message_alt(digi, obj, message):
-    global alt_state
-    alt_mqtt = int((message.payload.decode()))
-    alt_state = alt_mqtt
-
-
-def on_message_glow(digi, obj, message):
-    global glow_state
-    glow_mqtt = int((message.payload.decode()))
-    glow_state = glow_mqtt
-
-
-######
-#       Various Functions for Dash
-######
-
-def mileage():
-    #   Text File or Odometer and Tripometer Information (pulled from ManxGauged project, just reads from text file
-    #   Need to incorporate writing to the file after I figure out how to tabulate the mileage based on GPS or CV
-    global odo_font
-    odometer = 0
-    tripometer = 0
-    odofile = open("odo.txt", "r")
-    odo_from_file_text_line1 = odofile.readline()
-    response = odo_from_file_text_line1.replace('\n', "")
-    response2 = response.replace('\r', "")
-    response3 = response2.replace("odo:", "")
-    try:
-        odometer = int(response3)
-    except:
-        print("Error: ODO read from file is not an int")
-        error_reading_odo_from_file = 1
-    odometer_arduino = odometer
-
-    odo_from_file_text_line2 = odofile.readline()
-    response = odo_from_file_text_line2.replace('\n', "")
-    response2 = response.replace('\r', "")
-    response3 = response2.replace("trip:", "")
-    try:
-        tripometer = int(response3)
-    except:
-        print
-        "Error: Trip read from file is not an int"
-        error_reading_odo_from_file = 1
-    odofile.close()
-
-    digital_odo = odometer
-    odo_text = odo_font.render(str(digital_odo), True, NEON_GREEN)
-    text_rect = odo_text.get_rect()
-    text_rect.midright = ODO_L_XY
-    WIN.blit(odo_text, text_rect)
-
-#####
-#       Functions for Drawing onto the screen
-#####
-
-def draw_fuel_text():
-    #global digital_font
-    digital_fuel = fuel_status
-    fuel_text = digital_font.render(str(int(digital_fuel)), True, NEON_GREEN)
-    text_rect = fuel_text.get_rect()
-    text_rect.midright = 1717, 667
-    WIN.blit(fuel_text, text_rect)
-
-
-def draw_speedometer_text():
-    '''
-    Speedometer text and write
+def draw_digifiz(now=None):
     '''
-    #global speed_status
-    #global font_speedunits
-    speedtext = font_speedunits.render(str(speed_status), True, NEON_YELLOW)
-    text_rect = speedtext.get_rect()
-    text_rect.midright = SPEEDO_XY
-    WIN.blit(speedtext, text_rect)
-
-def draw_mfa():
+    Redraw whatever changed since last frame, returns the rects that need pushing to the display.
+    now is the frame time the bars move on, the monotonic clock unless given (bench.py simulates its own)
     '''
-    Drawing the interior temp only currently - the MFA will eventually evolve.
-    '''
-    #global outside_temp_status
-
-    WIN.blit(MFA, MFABG_XY)
-    #   Draw MFA display
-    text = digital_font.render(str(outside_temp_status), True, NEON_GREEN)
-    #   Enables the text to be right center aligned
-    text_rect = text.get_rect()
-    text_rect.midright = MFA_XY
-    WIN.blit(text, text_rect)
-
-
-
-
-def draw_indicators():
-    '''
-    The area where I blit or draw the indicators/idiot lights and turn signals/low fuel etc.
-    '''
-
-    if illumination_state == 1:
-        WIN.blit(indicator_images[0], (45, 460))
-    if foglight_state == 1:
-        WIN.blit(indicator_images[1], (185, 460))
-    if defog_state == 1:
-        WIN.blit(indicator_images[2], (325, 460))
-    if highbeam_state == 1:
-        WIN.blit(indicator_images[3], (465, 460))
-    if leftturn_state == 1:
-        WIN.blit(indicator_images[4], (605, 460))
-    if rightturn_state == 1:
-        WIN.blit(indicator_images[5], (1220, 460))
-    if brakewarn_state == 1:
-        WIN.blit(indicator_images[6], (1360, 460))
-    if oillight_state == 1:
-        WIN.blit(indicator_images[7], (1500, 460))
-    if alt_state == 1:
-        WIN.blit(indicator_images[8], (1640, 460))
-    if glow_state == 1:
-        WIN.blit(indicator_images[9], (1780, 460))
-
-    #   To highlight the fuel reserve indicator (factory is at 7 litres
-    if fuel_status <= 7:
-        WIN.blit(fuelresOn, (1795, 616))
-    else:
-        WIN.blit(fuelresOff, (1795, 616))
-
-#   Main Drawings for the program - Background + Gauges
-def draw_digifiz():
-    WIN.blit(BACKGROUND, (0, 0))
-    rpm.show(WIN)
-    coolant.show(WIN)
-    boost.show(WIN)
-    oilpressure.show(WIN)
-    egt.show(WIN)
-    mileage()
-    draw_indicators()
-    draw_clock()
-    draw_mfa()
-    draw_fuel_text()
-    draw_speedometer_text()
+    tracer.mark_frame()
+    values, changed = telemetry.snapshot()
+    if now is None:
+        now = time.monotonic()
+    if changed:
+        #   New samples are taken here on the render thread, never inside the MQTT callbacks
+        for gauge, slot in gauge_slots:
+            if values[slot] != gauge.smoother.last:
+                gauge.set_frame(values[slot], now)
+    #   Bars move on frame time, the renderer only redraws the ones whose image changed
+    for gauge, slot in gauge_slots:
+        gauge.update(now)
+    return renderer.render(values)
+
+
+def gauges_moving():
+    '''True while any bar is still easing or walking to its last sample, so the scheduler keeps drawing'''
+    now = time.monotonic()
+    return any(gauge.moving(now) for gauge, slot in gauge_slots)
 
 #####
 #       Main Function for the Pygame Program
 #####
 
 def main():
+    global telemetry
+    import paho.mqtt.client as mqttClient
+    from telemetry_bus import MqttMirror
+    from recorder import Recorder
+    from replay import ReplaySerial
+    from shared_telemetry import IngestProcess
+    from ecu_session import SessionRunner
+    from serial_to_mqtt import SerialToMQTT
+
     #   MQTT Variables
     broker_address = "localhost"  # Broker address
     port = 1883  # Broker port
+    mirror_mqtt = True  # Copy the ECU values onto the broker for Node-RED etc, the dash doesn't need it
+    record_drive = True  # Log raw ECU frames and every dash value to logs/, see recorder.py
+    replay_path = None  # A drive log or raw serial dump to play instead of the ECU, see replay.py
+    replay_speed = 1.0  # 1 = real time, N = N times faster, 0 = flat out
+    trace_latency = False  # Time every value from the serial read to the screen, L shows it, D dumps it to logs/
+    ingest_process = False  # Run the ECU bridge in its own process, values come back through shared memory
+    serial_port = "/dev/tty.PL2303G-USBtoUART1410"  # change to your serial device
     client = mqttClient.Client(client_id="me221_bridge")  # create new instance
     client.on_connect = on_connect  # attach function to callback
-    client.on_message = on_message  # attach function to callback
+    client.on_message = dispatcher.on_message  # every dash topic goes through the channel table
+
+    record_path = None
+    if record_drive and not replay_path:
+        record_path = datetime.now().strftime("logs/drive-%Y%m%d-%H%M%S.dglog")
+
+    bridge = ingest = recorder = None
+    if ingest_process:
+        #   Serial, decoding and the MQTT mirror run in another process and record their own log, along with
+        #   the broker's copies of the bridge's topics - the dash reads the shared block and handles the other topics
+        ingest = IngestProcess(serial_port, 115200, replay_path, replay_speed, mirror_mqtt,
+                               (broker_address, port), record_path)
+        ingest.start()
+        dispatcher.skip(ingest.topics())
+        telemetry = ingest.reader(telemetry, dispatcher.hooks)
+        if record_path:
+            recorder = Recorder(record_path.replace(".dglog", "-dash.dglog"))
+            recorder.start()
+            dispatcher.recorder = recorder
+    else:
+        bridge = SerialToMQTT(client=client, port=serial_port, baud=115200, bus=bus)
+        if replay_path:
+            bridge.ecu.ser = ReplaySerial(replay_path, speed=replay_speed)
+        #   The same topics stay subscribed on the broker for other publishers, minus the mirror's own echoes
+        mirror = MqttMirror(client) if mirror_mqtt else None
+        dispatcher.attach_bus(bus, bridge.topics(), mirror)
+        if mirror is not None:
+            bus.subscribe_all(mirror)
+
+        if record_path:
+            recorder = Recorder(record_path)
+            recorder.start()
+            bridge.ecu.recorder = recorder
+            dispatcher.recorder = recorder
+
+        if trace_latency:
+            bridge.ecu.tracer = tracer
+            bridge.tracer = tracer
+            dispatcher.tracer = tracer
+
     client.connect(broker_address, port=port)  # connect to broker
     client.loop_start()  # start the loop
 
-    bridge = SerialToMQTT(client=client, port="/dev/tty.PL2303G-USBtoUART1410", baud=115200)  # change to your serial device
-    # Create and start a new thread for the bridge
-    bridge_thread = threading.Thread(target=bridge.start)
-    bridge_thread.daemon = True # Allows the main program to exit even if this thread is still running
-    bridge_thread.start()
+    if bridge is not None:
+        #   The bridge runs as a session on its own asyncio loop thread, see ecu_session.py
+        sessions = SessionRunner()
+        sessions.start()
+        sessions.submit(bridge.run())
 
     #   MQTT Call backs... putting values in from topics
-    client.subscribe("#") #     Subscribes to all topics
-    client.message_callback_add('engine/rpm/state', on_message_rpm)
-    client.message_callback_add('engine/egt/state', on_message_egt)
-    client.message_callback_add('engine/oilpressure/state', on_message_oilpressure)
-    client.message_callback_add('engine/boost/state', on_message_boost)
-    client.message_callback_add('engine/coolant/state', on_message_coolant)
-    client.message_callback_add('engine/fuel/state', on_message_fuel)
-    client.message_callback_add('cabin/outside_temp/state', on_message_outside_temp)
-    client.message_callback_add('cabin/speed_cv/state', on_message_speed_cv)
-    client.message_callback_add('indicator/illumination/state', on_message_illumination)
-    client.message_callback_add('indicator/foglight/state', on_message_foglight)
-    client.message_callback_add('indicator/defog/state', on_message_defog)
-    client.message_callback_add('indicator/highbeam/state', on_message_highbeam)
-    client.message_callback_add('indicator/leftturn/state', on_message_leftturn)
-    client.message_callback_add('indicator/rightturn/state', on_message_rightturn)
-    client.message_callback_add('indicator/brakewarn/state', on_message_brakewarn)
-    client.message_callback_add('indicator/oillight/state', on_message_oillight)
-    client.message_callback_add('indicator/alt/state', on_message_alt)
-    client.message_callback_add('indicator/glow/state', on_message_glow)
-
-    #   The main loop, clock setting and click x for quit etc.
+    dispatcher.subscribe(client)
+
+    #   The main loop, frame scheduling and click x for quit etc.
     run = True
+    drew = True
+    first_frame = True
     while run:
-        clock.tick(FPS)
+        scheduler.wait(drew)
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 run = False
-
-        draw_digifiz()
-        pygame.display.update()
+            elif event.type == pygame.KEYDOWN and trace_latency:
+                if event.key == pygame.K_l:
+                    latency_overlay.toggle()
+                elif event.key == pygame.K_d:
+                    os.makedirs("logs", exist_ok=True)
+                    tracer.dump(datetime.now().strftime("logs/latency-%Y%m%d-%H%M%S.json"))
+
+        rects = draw_digifiz()
+        pygame.display.update(rects)
+        tracer.mark_display()
+        if first_frame:
+            first_frame = False
+            startup.mark("first frame")
+            startup.report()
+            if not bundled:
+                assets.rebake(BUNDLE, layout_images)
+        drew = bool(rects) or gauges_moving()
+        odometer.maybe_save()  # only a check, the write happens on the odometer's own thread
+        if ingest is not None:
+            ingest.check()  # logs it if the ingest process has died
     # After the main loop, clean up
-    bridge.stop()
-    bridge_thread.join() # Wait for the thread to finish
+    odometer.save()
+    if trace_latency:
+        os.makedirs("logs", exist_ok=True)
+        tracer.dump(datetime.now().strftime("logs/latency-%Y%m%d-%H%M%S.json"))
+    if ingest is not None:
+        ingest.stop()
+    else:
+        sessions.stop()  # Cancels the session, the port is closed by the time this returns
+    if recorder is not None:
+        recorder.close()
     pygame.quit()
     
 if __name__ == "__main__":
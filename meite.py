@@ -19,36 +19,129 @@ import time
 #     ecu.stop()
 # # -------------------------------------------
 
+class MEITEFramer:
+    """
+    Splits a byte stream into ME frames without copying it around.
+
+    Bytes land in one fixed bytearray, a read cursor walks through it and
+    frames are handed out as memoryviews into that array.  The unread tail
+    is only moved back to the front when there is no room left for more data.
+    A yielded frame is only valid until the next one is asked for - take
+    bytes(frame) if it has to outlive that.
+    """
+    SYNC = b"ME"
+    HEADER_LEN = 7
+    # Largest frame an ME221 actually sends: the channel definition is 3 bytes per channel and a data
+    # frame at most 4, so even all ~110 channels stay well under this.  The length field could say
+    # up to 65535, but a false "ME" in line noise claiming that much would swallow seconds of real frames
+    MAX_FRAME = 1024
+
+    def __init__(self, capacity=1 << 17, max_frame=MAX_FRAME):
+        # Room for plenty of frames plus the biggest read feed() takes (half the capacity)
+        self.buf = bytearray(capacity)
+        self.view = memoryview(self.buf)
+        self.start = 0  # first unread byte
+        self.end = 0    # one past the last byte written
+        self.max_frame = max_frame
+
+    def __len__(self):
+        return self.end - self.start
+
+    def _room(self, size):
+        """Make sure size bytes fit after end, compacting if that is what it takes"""
+        if self.end + size <= len(self.buf):
+            return
+        pending = self.end - self.start
+        if pending + size > len(self.buf):
+            # Can't happen with sane frames, drop what we have rather than grow forever
+            print(f"[MEITE] Framer overflow, dropping {pending} bytes")
+            self.start = self.end = 0
+            return
+        self.view[0:pending] = self.view[self.start:self.end]
+        self.start = 0
+        self.end = pending
+
+    def feed(self, data):
+        """Append received bytes, at most half the capacity at a time - see push() for big chunks"""
+        size = len(data)
+        self._room(size)
+        self.view[self.end:self.end + size] = data
+        self.end += size
+
+    def frames(self):
+        """Yield every complete frame currently buffered, as memoryviews"""
+        buf = self.buf
+        while True:
+            start = self.start
+            if self.end - start < self.HEADER_LEN:
+                return
+            if buf[start] != 0x4D or buf[start + 1] != 0x45:
+                # Garbage before the sync, search from here on - never from the beginning again
+                found = buf.find(self.SYNC, start, self.end)
+                if found == -1:
+                    # Keep a trailing "M", it may be the first half of the next sync
+                    self.start = self.end - 1 if buf[self.end - 1] == 0x4D else self.end
+                    return
+                self.start = found
+                continue
+            total_len = self.HEADER_LEN + (buf[start + 2] | buf[start + 3] << 8)
+            if total_len > self.max_frame:
+                # No ME221 frame is that long, not a real header - skip this sync and look again
+                self.start = start + 1
+                continue
+            if self.end - start < total_len:
+                return
+            self.start = start + total_len
+            yield self.view[start:start + total_len]
+
+    def push(self, data):
+        """Feed any amount of data and yield the frames it completes"""
+        step = len(self.buf) // 2
+        for pos in range(0, len(data), step):
+            self.feed(data[pos:pos + step])
+            yield from self.frames()
+
+
 class MEITE:
     SYNC = b"ME"
+    START_REQUEST = bytes([0x4D, 0x45, 0x01, 0x00,
+                           0x00, 0x00, 0x02, 0x01, 0x03, 0x05])
+    ACK = bytes([0x4D, 0x45, 0x01, 0x00,
+                 0x0F, 0x00, 0x01, 0x00, 0x10, 0x3E])  # 7 bytes only
 
-    def __init__(self, port="/dev/ttyUSB0", baud=115200):
+    def __init__(self, port="/dev/ttyUSB0", baud=115200, verbose=False):
         self.port = port
         self.baud = baud
+        self.verbose = verbose  # print every frame header
         self.ser = None
-        self.buffer = b""
+        self.framer = MEITEFramer()
+        self.recorder = None  # recorder.Recorder, gets every raw frame when set
+        self.tracer = None  # latency.LatencyTracer, stamps every read when set
         self.running = False
 
     def connect(self):
-        """Open serial connection to ECU"""
+        """Open serial connection to ECU, unless a port (or a replay/simulator stand-in) is already attached"""
+        if self.ser is not None and self.ser.is_open:
+            print(f"[MEITE] Using attached port {getattr(self.ser, 'port', None) or type(self.ser).__name__}")
+            return
         self.ser = serial.Serial(self.port, self.baud, timeout=1)
         print(f"[MEITE] Connected on {self.port} @ {self.baud}")
 
     def start_reporting(self):
         """Send the request that starts ECU reporting"""
-        req = bytes([0x4D, 0x45, 0x01, 0x00,
-                     0x00, 0x00, 0x02, 0x01, 0x03, 0x05])
-        self.ser.write(req)
+        self.ser.write(self.START_REQUEST)
         print("[MEITE] Sent start reporting request")
 
+    def send_ack(self):
+        """Tell the ECU we are still listening, it stops reporting without one every so often"""
+        self.ser.write(self.ACK)
+        print("[MEITE] Sent ACK")
+
     def start_ack_loop(self):
         """Send ACK every second in a background thread"""
         def loop():
-            ack = bytes([0x4D, 0x45, 0x01, 0x00,
-                        0x0F, 0x00, 0x01, 0x00, 0x10, 0x3E])  # 7 bytes only
             while self.running:
-                self.ser.write(ack)
-                print("[MEITE] Sent ACK")
+                self.send_ack()
                 time.sleep(1)
 
         self.running = True
@@ -63,23 +156,25 @@ class MEITE:
             print("[MEITE] Serial closed")
 
     def read_frames(self):
-        """Read from serial and yield complete frames"""
+        """
+        Read from serial and yield complete frames.
+        Frames are memoryviews into the framer's buffer, valid until the next frame is read.
+        """
         while self.running:
-            data = self.ser.read(1024)
+            # Take whatever has arrived, only block (up to the timeout) when nothing has
+            data = self.ser.read(self.ser.in_waiting or 1)
             if data:
-                self.buffer += data
-                while True:
-                    start = self.buffer.find(self.SYNC)
-                    if start == -1 or len(self.buffer) < start + 7:
-                        break
-                    frame_len = struct.unpack_from("<H", self.buffer, start+2)[0]
-                    total_len = 7 + frame_len
-                    if len(self.buffer) >= start + total_len:
-                        frame = self.buffer[start:start+total_len]
-                        yield frame
-                        self.buffer = self.buffer[start+total_len:]
-                    else:
-                        break
+                yield from self.frames_from(data)
+
+    def frames_from(self, data):
+        """Frames completed by a chunk of received bytes, recorded and traced - shared with ecu_session"""
+        if self.tracer is not None:
+            self.tracer.mark_read()
+        recorder = self.recorder
+        for frame in self.framer.push(data):
+            if recorder is not None:
+                recorder.record_frame(frame)
+            yield frame
 
     def parse_frame(self, frame):
         """Decode and return a frame dict"""
@@ -89,7 +184,8 @@ class MEITE:
         msg_id = frame[6]
         payload = frame[7:7+length]
 
-        print(f"[MEITE] Frame: len={length}, type={msg_type}, class={class_id}, msg={msg_id}")
+        if self.verbose:
+            print(f"[MEITE] Frame: len={length}, type={msg_type}, class={class_id}, msg={msg_id}")
         return {
             "len": length,
             "type": msg_type,
@@ -1,3 +1,4 @@
+import bisect
 import struct
 
 # Data ID → name mapping (from Appendix A of doc)
@@ -127,9 +128,13 @@ TYPE_MAP = {
 class MEITEDecoder:
     def __init__(self):
         self.channel_map = []  # [(name, fmt), ...]
+        self.names = ()        # channel names, in frame order
+        self.record = None     # struct.Struct for status byte + every channel
+        self._ends = []        # payload offset just past each channel
+        self._prefixes = {}    # channel count -> Struct, for short frames
 
     def parse_definition(self, payload: bytes):
-        """Decode msg=2 payload (channel definitions)."""
+        """Decode msg=2 payload (channel definitions) and compile the data frame layout."""
         status = payload[0]
         num_entities = struct.unpack_from("<H", payload, 1)[0]
         offset = 3
@@ -145,24 +150,46 @@ class MEITEDecoder:
             if fmt:
                 self.channel_map.append((name, fmt))
 
+        # One Struct for the whole frame: "<" + status byte + each channel's code, no padding
+        codes = "".join(fmt[1:] for _, fmt in self.channel_map)
+        self.names = tuple(name for name, _ in self.channel_map)
+        self.record = struct.Struct("<B" + codes)
+        self._ends = []
+        end = 1
+        for _, fmt in self.channel_map:
+            end += struct.calcsize(fmt)
+            self._ends.append(end)
+        self._prefixes = {}
+
         print("[MEITE] Channel map built:", self.channel_map)
 
+    def _short(self, payload):
+        """Struct covering only the channels that fit in a truncated payload."""
+        count = bisect.bisect_right(self._ends, len(payload))
+        record = self._prefixes.get(count)
+        if record is None:
+            codes = "".join(fmt[1:] for _, fmt in self.channel_map[:count])
+            record = struct.Struct("<B" + codes)
+            self._prefixes[count] = record
+        return record
+
+    def parse_values(self, payload):
+        """
+        Decode msg=0 payload into a tuple of values in self.names order.
+        One unpack_from straight out of the payload (bytes or memoryview), no slicing.
+        A truncated payload gives a shorter tuple with the channels that fit.
+        """
+        record = self.record
+        if record is None or len(payload) < 1:
+            return ()
+        if len(payload) < record.size:
+            record = self._short(payload)
+        return record.unpack_from(payload)[1:]
+
     def parse_data(self, payload: bytes):
         """Decode msg=0 payload (live values)."""
         if not self.channel_map:
             print("[MEITE] No channel map yet, skipping data")
             return {}
 
-        status = payload[0]
-        offset = 1
-        values = {}
-
-        for name, fmt in self.channel_map:
-            size = struct.calcsize(fmt)
-            raw = payload[offset:offset+size]
-            if len(raw) == size:
-                val = struct.unpack(fmt, raw)[0]
-                values[name] = val
-            offset += size
-
-        return values
+        return dict(zip(self.names, self.parse_values(payload)))
@@ -0,0 +1,123 @@
+'''
+Odometer and tripometer kept in memory.
+
+odo.txt is read once at startup.  Distance is integrated from the speed
+updates and written back every so often, through a temp file and a rename so
+a power cut mid-write never leaves a half written odo.txt behind.  Those
+writes, fsync and all, happen on a background thread - the render loop only
+checks whether one is due.
+'''
+import math
+import os
+import threading
+import time
+
+from constants import ODO_FILE, ODO_SAVE_INTERVAL
+
+MAX_GAP = 5.0   #   seconds, longer gaps between speed updates are not integrated
+
+
+class Odometer:
+    def __init__(self, path=ODO_FILE, save_interval=ODO_SAVE_INTERVAL):
+        self.path = path
+        self.save_interval = save_interval
+        self.odometer = 0.0
+        self.tripometer = 0.0
+        self.lock = threading.Lock()
+        self._speed = 0
+        self._speed_time = None
+        self._saved_at = time.monotonic()
+        self._unsaved = False
+        self._save_lock = threading.Lock()  # one write to the temp file at a time
+        self._wake = threading.Event()
+        self._thread = None     # the writer, started on the first save that's due
+        self.load()
+
+    def load(self):
+        '''Read odo:/trip: from the file (whole numbers or with the fraction saved since), a bad or missing value stays at 0'''
+        try:
+            with open(self.path, "r") as odofile:
+                lines = odofile.read().splitlines()
+        except OSError as e:
+            print(f"[ODO] Could not read {self.path}: {e}")
+            return
+        for line in lines:
+            key, _, value = line.strip().partition(":")
+            try:
+                if key == "odo":
+                    self.odometer = self._distance(value)
+                elif key == "trip":
+                    self.tripometer = self._distance(value)
+            except ValueError:
+                print(f"Error: {key} read from file is not a number")
+
+    @staticmethod
+    def _distance(value):
+        distance = float(value)
+        if not math.isfinite(distance) or distance < 0:
+            raise ValueError(value)
+        return distance
+
+    def update_speed(self, speed, now=None):
+        '''Feed a speed reading (distance units per hour), integrates the distance since the last one'''
+        if now is None:
+            now = time.monotonic()
+        with self.lock:
+            if self._speed_time is not None:
+                dt = now - self._speed_time
+                if 0 < dt <= MAX_GAP:
+                    #   Trapezoid between the two readings
+                    distance = (self._speed + speed) * 0.5 * dt / 3600.0
+                    self.odometer += distance
+                    self.tripometer += distance
+                    self._unsaved = True
+            self._speed = speed
+            self._speed_time = now
+
+    def reading(self):
+        '''The whole number shown on the dash'''
+        return int(self.odometer)
+
+    def trip(self):
+        return int(self.tripometer)
+
+    def reset_trip(self):
+        with self.lock:
+            self.tripometer = 0.0
+            self._unsaved = True
+
+    def maybe_save(self, now=None):
+        '''Cheap to call every frame, once per save_interval when something changed it wakes the writer thread'''
+        if now is None:
+            now = time.monotonic()
+        if self._unsaved and now - self._saved_at >= self.save_interval:
+            self._saved_at = now    # not due again for another interval, however long the write takes
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._writer, name="odometer", daemon=True)
+                self._thread.start()
+            self._wake.set()
+
+    def _writer(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            self.save()
+
+    def save(self, now=None):
+        '''Write to a temp file next to odo.txt and rename it over the top, blocks until it is on disk'''
+        with self._save_lock:
+            with self.lock:
+                #   The fraction too, or every restart would drop up to a whole unit from each
+                text = f"odo:{self.odometer:.3f}\ntrip:{self.tripometer:.3f}\n"
+                self._unsaved = False
+            tmp_path = self.path + ".tmp"
+            try:
+                with open(tmp_path, "w") as odofile:
+                    odofile.write(text)
+                    odofile.flush()
+                    os.fsync(odofile.fileno())
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                print(f"[ODO] Could not save {self.path}: {e}")
+                self._unsaved = True
+            self._saved_at = time.monotonic() if now is None else now
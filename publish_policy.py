@@ -0,0 +1,72 @@
+'''
+Decides which decoded ECU values are worth publishing.
+
+A value goes out when it has moved by more than its topic's deadband since
+the last published value, no sooner than the topic's max rate allows.
+Unchanged values are held back, apart from a keepalive so a dash that
+(re)connects late still gets every topic.  Topics whose listeners need a
+steady stream even when nothing changes (the speed the odometer integrates)
+get a shorter keepalive of their own.
+'''
+import time
+
+
+class TopicState:
+    __slots__ = ("deadband", "min_interval", "keepalive", "value", "sent_at")
+
+    def __init__(self, deadband, max_rate, keepalive):
+        self.deadband = deadband
+        self.min_interval = 1.0 / max_rate if max_rate else 0.0
+        self.keepalive = keepalive
+        self.value = None
+        self.sent_at = None
+
+
+class PublishPolicy:
+    '''
+    deadbands:  {topic: smallest change worth publishing}, default_deadband for the rest
+                (0 means publish any change, never the same value twice)
+    max_rates:  {topic: publishes per second}, default_max_rate for the rest (None = unlimited)
+    keepalive:  seconds after which an unchanged value is sent again anyway (None = never)
+    keepalives: {topic: seconds} overriding keepalive for single topics
+    '''
+    def __init__(self, deadbands=None, max_rates=None, default_deadband=0,
+                 default_max_rate=None, keepalive=5.0, keepalives=None):
+        self.deadbands = deadbands or {}
+        self.max_rates = max_rates or {}
+        self.keepalives = keepalives or {}
+        self.default_deadband = default_deadband
+        self.default_max_rate = default_max_rate
+        self.keepalive = keepalive
+        self.topics = {}
+        self.sent = 0
+        self.suppressed = 0
+
+    def _state(self, topic):
+        state = TopicState(self.deadbands.get(topic, self.default_deadband),
+                           self.max_rates.get(topic, self.default_max_rate),
+                           self.keepalives.get(topic, self.keepalive))
+        self.topics[topic] = state
+        return state
+
+    def should_publish(self, topic, value, now=None):
+        '''True if value should go out on topic now, and records it as sent'''
+        if now is None:
+            now = time.monotonic()
+        state = self.topics.get(topic) or self._state(topic)
+
+        if state.sent_at is not None:
+            elapsed = now - state.sent_at
+            if elapsed < state.min_interval:
+                self.suppressed += 1
+                return False
+            #   Compared against the last *published* value, so slow drifts still get through
+            if abs(value - state.value) <= state.deadband and \
+                    (state.keepalive is None or elapsed < state.keepalive):
+                self.suppressed += 1
+                return False
+
+        state.value = value
+        state.sent_at = now
+        self.sent += 1
+        return True
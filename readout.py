@@ -0,0 +1,182 @@
+'''
+Seven segment readouts for the dash, drawn without a font.
+
+The digits are built the way the real display is: seven bevelled segments per
+digit, a decimal point, and a colon cell for the clock.  For each size the
+segment shapes are rasterised once, at 4x and smoothed down for clean edges,
+into alpha masks.  For each colour every character cell is then put together
+from those masks once, lit segments in the readout colour and, when the
+readout has an unlit colour, the dark segments around them in the same cell -
+so the ghosted "88:88" look costs nothing extra.
+
+Drawing a value is one blit per character, and anchored by midright the
+numbers line up on their last digit.  Layouts of the last few strings are kept.
+
+The proportions follow DSEG7 Classic Bold, the font these readouts used before,
+so a size still means the digit height in pixels.
+'''
+from collections import OrderedDict
+
+import pygame
+
+SCALE = 4   #   supersampling used when rasterising the segment shapes
+
+#   Digit cell, in units of the digit height
+ADVANCE = 0.816     #   cell to cell
+LEFT = 0.098        #   outer edge of the left segments
+RIGHT = 0.718       #   outer edge of the right segments
+THICK = 0.126       #   segment thickness
+GAP = 0.018         #   space between neighbouring segments
+COLON_ADVANCE = 0.2
+COLON_X = 0.1
+COLON_Y = (0.307, 0.716)
+DOT = 0.066         #   radius of the colon dots and the decimal point
+
+#   Segments a..g, the usual way round: a top, b c right, d bottom, e f left, g middle
+SEGMENTS = "abcdefg"
+CHARS = {
+    "0": "abcdef", "1": "bc", "2": "abdeg", "3": "abcdg", "4": "bcfg",
+    "5": "acdfg", "6": "acdefg", "7": "abc", "8": "abcdefg", "9": "abcdfg",
+    "-": "g", " ": "",
+}
+
+
+def segment_polygons(height):
+    '''Outline of every segment for a digit height in pixels, {segment: points}'''
+    h, half = height, height / 2
+    l, r, t, g = LEFT * h, RIGHT * h, THICK * h, GAP * h
+    return {
+        "a": [(l + g, 0), (r - g, 0), (r - t - g, t), (l + t + g, t)],
+        "b": [(r, g), (r, half - g), (r - t, half - t / 2 - g), (r - t, t + g)],
+        "c": [(r, half + g), (r, h - g), (r - t, h - t - g), (r - t, half + t / 2 + g)],
+        "d": [(l + t + g, h - t), (r - t - g, h - t), (r - g, h), (l + g, h)],
+        "e": [(l, half + g), (l + t, half + t / 2 + g), (l + t, h - t - g), (l, h - g)],
+        "f": [(l, g), (l + t, t + g), (l + t, half - t / 2 - g), (l, half - g)],
+        "g": [(l + g, half), (l + t / 2 + g, half - t / 2), (r - t / 2 - g, half - t / 2),
+              (r - g, half), (r - t / 2 - g, half + t / 2), (l + t / 2 + g, half + t / 2)],
+    }
+
+
+class SegmentMasks:
+    '''White segment shapes with anti-aliased alpha for one digit height, colour them with tint()'''
+    def __init__(self, height):
+        self.height = height
+        self.advance = round(ADVANCE * height)
+        self.colon_advance = round(COLON_ADVANCE * height)
+        dot = DOT * height
+        #   The decimal point sits on the boundary to the next cell, so a digit cell is a little wider
+        self.width = self.advance + int(dot) + 1
+        self.segments = {name: self._raster(self.width, [points]) for name, points in segment_polygons(height).items()}
+        self.point = self._raster(self.width, [], [(self.advance, height - dot, dot)])
+        self.colon = self._raster(self.colon_advance, [], [(COLON_X * height, y * height, dot) for y in COLON_Y])
+
+    def _raster(self, width, polygons, circles=()):
+        big = pygame.Surface((width * SCALE, self.height * SCALE), pygame.SRCALPHA)
+        for points in polygons:
+            pygame.draw.polygon(big, (255, 255, 255), [(x * SCALE, y * SCALE) for x, y in points])
+        for x, y, radius in circles:
+            pygame.draw.circle(big, (255, 255, 255), (x * SCALE, y * SCALE), radius * SCALE)
+        return pygame.transform.smoothscale(big, (width, self.height))
+
+    @staticmethod
+    def tint(mask, colour):
+        surface = mask.copy()
+        surface.fill(tuple(colour[:3]) + (255,), special_flags=pygame.BLEND_RGBA_MULT)
+        return surface
+
+
+_masks = {}     #   height -> SegmentMasks
+
+
+def segment_masks(height):
+    '''One set of masks per height, shared by every readout'''
+    masks = _masks.get(height)
+    if masks is None:
+        masks = SegmentMasks(height)
+        _masks[height] = masks
+    return masks
+
+
+class Readout:
+    '''
+    A seven segment readout at one size and colour.
+    unlit is the colour of the segments that are off (DARK_GREY for the ghosted look), None leaves them out.
+    digits pads shorter values on the left with blank digits, which show unlit when there is an unlit colour.
+    draw(screen, text, **anchor) - anchor is any pygame.Rect position, e.g. midright=(x, y).
+    Text can hold 0-9, "-", " ", ":" and "." (which lights the point of the digit before it).
+    '''
+    def __init__(self, size, colour, unlit=None, digits=0, maxsize=16):
+        self.masks = segment_masks(size)
+        self.height = size
+        self.unlit = unlit
+        self.digits = digits
+        self.maxsize = maxsize
+        self.lit = {name: SegmentMasks.tint(mask, colour) for name, mask in self.masks.segments.items()}
+        self.off = {name: SegmentMasks.tint(mask, unlit) for name, mask in self.masks.segments.items()} if unlit else {}
+        self.point = SegmentMasks.tint(self.masks.point, colour)
+        self.colon = SegmentMasks.tint(self.masks.colon, colour)
+        self.cells = {}
+        self.layouts = OrderedDict()
+        for char in CHARS:
+            self.cell(char, False)
+
+    def cell(self, char, point):
+        '''The composed cell for one character, with or without its decimal point, built the first time'''
+        key = (char, point)
+        cell = self.cells.get(key)
+        if cell is None:
+            if char == ":":
+                cell = self.colon.copy()
+            else:
+                lit = CHARS[char]
+                cell = pygame.Surface((self.masks.width, self.height), pygame.SRCALPHA)
+                #   Segments never overlap, MAX onto a cleared cell copies each one without blending
+                for name in SEGMENTS:
+                    if name in lit:
+                        cell.blit(self.lit[name], (0, 0), special_flags=pygame.BLEND_RGBA_MAX)
+                    elif name in self.off:
+                        cell.blit(self.off[name], (0, 0), special_flags=pygame.BLEND_RGBA_MAX)
+                if point:
+                    cell.blit(self.point, (0, 0), special_flags=pygame.BLEND_RGBA_MAX)
+            #   Run length encoded, a blit skips the transparent runs between segments - several times faster
+            cell.set_alpha(255, pygame.RLEACCEL)
+            self.cells[key] = cell
+        return cell
+
+    def layout(self, text):
+        '''(cells, width) - each cell as (surface, x) from the left edge, width up to the last cell's advance'''
+        layout = self.layouts.get(text)
+        if layout is not None:
+            self.layouts.move_to_end(text)
+            return layout
+        glyphs = []     #   [char, point]
+        for char in text:
+            if char != ".":
+                glyphs.append([char, False])
+            elif glyphs and glyphs[-1][0] != ":" and not glyphs[-1][1]:
+                glyphs[-1][1] = True
+            else:
+                glyphs.append([" ", True])
+        blanks = self.digits - sum(1 for char, point in glyphs if char != ":")
+        glyphs = [[" ", False]] * blanks + glyphs
+
+        cells = []
+        x = 0
+        for char, point in glyphs:
+            cells.append((self.cell(char, point), x))
+            x += self.masks.colon_advance if char == ":" else self.masks.advance
+        layout = (cells, x)
+        self.layouts[text] = layout
+        if len(self.layouts) > self.maxsize:
+            self.layouts.popitem(last=False)
+        return layout
+
+    def draw(self, screen, text, **anchor):
+        '''Blit text onto screen and return the rect it covered'''
+        cells, width = self.layout(text)
+        rect = pygame.Rect(0, 0, width, self.height)
+        for name, value in anchor.items():
+            setattr(rect, name, value)
+        x, y = rect.topleft
+        drawn = screen.blits([(cell, (x + offset, y)) for cell, offset in cells])
+        return rect.unionall(drawn)
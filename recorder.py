@@ -0,0 +1,160 @@
+'''
+Drive recorder - raw MEITE frames and decoded dash channel updates in one
+compact binary log.
+
+Recording only appends to in-memory buffers, a background thread writes
+them out in chunks every couple of seconds, so the SD card sees a few large
+sequential writes instead of one per sample.
+
+File layout (all little endian):
+
+    header      "DGFZLOG1", u32 version, f64 wall clock start, u16 n, n channel names (u8 len + utf-8)
+    chunk...    chunk header + body, see below
+    index       u32 count, count index entries (same layout as a chunk header + u64 file offset)
+    footer      "DGFZINDX", u64 offset of the index
+
+    chunk header    4s kind, u32 record count, u32 body bytes, u64 first t, u64 last t
+    FRAM body       count records of: u64 t, u32 length, frame bytes
+    CHAN body       u64 t column (count), u8 slot column (count), f64 value column (count)
+
+Times are nanoseconds since the recording started.  A log cut short by a power
+loss has no index, but the chunks can still be walked from the header on.
+'''
+import os
+import struct
+import threading
+import time
+from array import array
+
+from telemetry import CHANNELS
+
+MAGIC = b"DGFZLOG1"
+FOOTER_MAGIC = b"DGFZINDX"
+VERSION = 1
+
+HEADER = struct.Struct("<8sIdH")
+CHUNK = struct.Struct("<4sIIQQ")
+INDEX_ENTRY = struct.Struct("<4sIIQQQ")
+FOOTER = struct.Struct("<8sQ")
+FRAME_RECORD = struct.Struct("<QI")
+
+KIND_FRAMES = b"FRAM"
+KIND_CHANNELS = b"CHAN"
+
+
+class Recorder:
+    def __init__(self, path, channels=CHANNELS, flush_interval=2.0, max_buffer=1 << 20):
+        self.path = path
+        self.channels = channels
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.running = False
+        self.thread = None
+        self.file = None
+        self.index = []
+        self.start_ns = time.monotonic_ns()
+        self._new_buffers()
+
+    def _new_buffers(self):
+        self.frames = bytearray()
+        self.frame_count = 0
+        self.frame_t = (0, 0)
+        self.times = array("Q")
+        self.slots = array("B")
+        self.values = array("d")
+
+    def start(self):
+        '''Open the log and start the writer thread'''
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.file = open(self.path, "wb", buffering=1 << 16)
+        names = b""
+        for name in self.channels:
+            name = name.encode()[:255]
+            names += bytes([len(name)]) + name
+        self.file.write(HEADER.pack(MAGIC, VERSION, time.time(), len(self.channels)) + names)
+        self.running = True
+        self.thread = threading.Thread(target=self._writer, daemon=True)
+        self.thread.start()
+        print(f"[REC] Recording to {self.path}")
+
+    def now(self):
+        return time.monotonic_ns() - self.start_ns
+
+    def record_frame(self, frame, t=None):
+        '''A raw frame straight from MEITE.read_frames (bytes or memoryview, copied here)'''
+        if t is None:
+            t = self.now()
+        with self.lock:
+            if not self.frame_count:
+                self.frame_t = (t, t)
+            else:
+                self.frame_t = (self.frame_t[0], t)
+            self.frames += FRAME_RECORD.pack(t, len(frame))
+            self.frames += frame
+            self.frame_count += 1
+            full = len(self.frames) >= self.max_buffer
+        if full:
+            self.wake.set()
+
+    def record_value(self, slot, value, t=None):
+        '''A decoded channel update, slot is a telemetry slot'''
+        if t is None:
+            t = self.now()
+        with self.lock:
+            self.times.append(t)
+            self.slots.append(slot)
+            self.values.append(value)
+
+    def _writer(self):
+        while self.running:
+            self.wake.wait(self.flush_interval)
+            self.wake.clear()
+            self.flush()
+
+    def flush(self):
+        '''Swap the buffers out and write them as chunks'''
+        with self.lock:
+            frames, frame_count, frame_t = self.frames, self.frame_count, self.frame_t
+            times, slots, values = self.times, self.slots, self.values
+            self._new_buffers()
+        if self.file is None:
+            return
+        if frame_count:
+            self._chunk(KIND_FRAMES, frame_count, frame_t, (frames,))
+        if times:
+            self._chunk(KIND_CHANNELS, len(times), (times[0], times[-1]),
+                        (times.tobytes(), slots.tobytes(), values.tobytes()))
+        if frame_count or times:
+            self.file.flush()
+
+    def _chunk(self, kind, count, span, parts):
+        size = sum(len(part) for part in parts)
+        offset = self.file.tell()
+        self.file.write(CHUNK.pack(kind, count, size, span[0], span[1]))
+        for part in parts:
+            self.file.write(part)
+        self.index.append((kind, count, size, span[0], span[1], offset))
+
+    def close(self):
+        '''Flush what's left, write the index and close the file'''
+        if self.file is None:
+            return
+        self.running = False
+        self.wake.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.flush()
+        index_offset = self.file.tell()
+        self.file.write(struct.pack("<I", len(self.index)))
+        for entry in self.index:
+            self.file.write(INDEX_ENTRY.pack(*entry))
+        self.file.write(FOOTER.pack(FOOTER_MAGIC, index_offset))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        self.file = None
+        print(f"[REC] Closed {self.path}")
@@ -0,0 +1,98 @@
+'''
+Retained-mode dirty rectangle renderer for the dash.
+
+Every element on screen (rpm bar, aux gauges, indicators, readouts) owns a
+rect and a dirty flag.  Each frame only the elements whose value changed get
+their old patch restored from the background and redrawn, and only those
+patches are handed to pygame.display.update().
+'''
+
+
+class Element:
+    '''
+    One thing drawn on the dash.
+    draw(surface, value) paints the element and returns the rect it covers,
+    state(values) picks the value it shows out of the telemetry snapshot -
+    the element is redrawn when that value changes.
+    opaque elements paint every pixel of the same rect each time (a baked layer patch),
+    so their patch is never restored from the background first.
+    '''
+    def __init__(self, name, draw, state=None, opaque=False):
+        self.name = name
+        self.draw = draw
+        self.state = state
+        self.opaque = opaque
+        self.value = None
+        self.rect = None
+        self.dirty = True
+
+    def check(self, values):
+        '''Pull the current value and flag the element if it moved'''
+        if self.state is not None:
+            value = self.state(values)
+            if value != self.value:
+                self.value = value
+                self.dirty = True
+        return self.dirty
+
+
+class Renderer:
+    def __init__(self, surface, background):
+        self.surface = surface
+        self.background = background
+        self.elements = []
+        self.full = True
+
+    def add(self, element):
+        '''Elements are drawn in the order they are added'''
+        self.elements.append(element)
+        return element
+
+    def invalidate(self):
+        '''Force a full repaint on the next render, e.g. after a window change'''
+        self.full = True
+
+    def render(self, values=None):
+        '''Redraw whatever changed in this telemetry snapshot and return the rects to push to the display'''
+        surface = self.surface
+
+        if self.full:
+            self.full = False
+            surface.blit(self.background, (0, 0))
+            for element in self.elements:
+                element.check(values)
+                element.rect = element.draw(surface, element.value)
+                element.dirty = False
+            return [surface.get_rect()]
+
+        dirty = [element for element in self.elements if element.check(values)]
+        if not dirty:
+            return []
+
+        #   Restoring a patch wipes anything else sitting in it, so those elements come back too
+        areas = []
+        restore = []
+        pending = dirty
+        while pending:
+            for element in pending:
+                if element.rect is not None:
+                    areas.append(element.rect)
+                    if not element.opaque:
+                        restore.append(element.rect)
+            pending = [element for element in self.elements
+                       if not element.dirty and element.rect is not None
+                       and element.rect.collidelist(areas) != -1]
+            for element in pending:
+                element.dirty = True
+
+        for area in restore:
+            surface.blit(self.background, area, area)
+
+        for element in self.elements:
+            if element.dirty:
+                element.rect = element.draw(surface, element.value)
+                element.dirty = False
+                if element.rect not in areas:
+                    areas.append(element.rect)
+
+        return areas
@@ -0,0 +1,246 @@
+'''
+Replay recorded captures through the ECU pipeline and the dash.
+
+ReplaySerial stands in for the serial port under MEITE, so a capture goes
+through MEITE.read_frames, parse_frame, MEITEDecoder and SerialToMQTT.publish
+exactly like live data.  It takes either a drive log written by recorder.py
+or a raw byte dump of the serial line, memory-maps it and hands out slices,
+so a multi-hour capture is never loaded into RAM.
+
+speed is 1.0 for real time, N for N times faster, 0 for as fast as possible.
+
+    python replay.py logs/drive-20261018-091500.dglog --speed 0
+'''
+import argparse
+import mmap
+import struct
+import time
+
+from recorder import (MAGIC, FOOTER_MAGIC, HEADER, CHUNK, INDEX_ENTRY, FOOTER,
+                      FRAME_RECORD, KIND_FRAMES, KIND_CHANNELS)
+
+
+class LogReader:
+    '''Memory-mapped reader for recorder.py logs'''
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.map)
+
+        magic, self.version, self.started, count = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a drive log")
+        offset = HEADER.size
+        self.channels = []
+        for _ in range(count):
+            size = self.map[offset]
+            self.channels.append(bytes(self.map[offset + 1:offset + 1 + size]).decode())
+            offset += 1 + size
+        self.data_start = offset
+        self.index = self._read_index() or self._scan()
+
+    @staticmethod
+    def is_log(path):
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+
+    def _read_index(self):
+        '''Index from the footer, None if the log was never closed properly'''
+        if len(self.map) < self.data_start + FOOTER.size:
+            return None
+        magic, offset = FOOTER.unpack_from(self.map, len(self.map) - FOOTER.size)
+        if magic != FOOTER_MAGIC:
+            return None
+        count = struct.unpack_from("<I", self.map, offset)[0]
+        return [INDEX_ENTRY.unpack_from(self.map, offset + 4 + n * INDEX_ENTRY.size) for n in range(count)]
+
+    def _scan(self):
+        '''Walk the chunks from the header on, for logs cut short by a power loss'''
+        print(f"[REPLAY] {self.path} has no index, scanning chunks")
+        index = []
+        offset = self.data_start
+        end = len(self.map)
+        while offset + CHUNK.size <= end:
+            kind, count, size, first, last = CHUNK.unpack_from(self.map, offset)
+            if kind not in (KIND_FRAMES, KIND_CHANNELS) or offset + CHUNK.size + size > end:
+                break
+            index.append((kind, count, size, first, last, offset))
+            offset += CHUNK.size + size
+        return index
+
+    def frames(self):
+        '''(t ns, frame memoryview) for every raw frame, in order'''
+        view = self.view
+        for kind, count, size, first, last, offset in self.index:
+            if kind != KIND_FRAMES:
+                continue
+            pos = offset + CHUNK.size
+            for _ in range(count):
+                t, length = FRAME_RECORD.unpack_from(view, pos)
+                pos += FRAME_RECORD.size
+                yield t, view[pos:pos + length]
+                pos += length
+
+    def values(self):
+        '''(t ns, slot, value) for every decoded channel update, in order'''
+        view = self.view
+        for kind, count, size, first, last, offset in self.index:
+            if kind != KIND_CHANNELS:
+                continue
+            pos = offset + CHUNK.size
+            times = view[pos:pos + 8 * count].cast("Q")
+            slots = view[pos + 8 * count:pos + 9 * count]
+            values = view[pos + 9 * count:pos + 17 * count].cast("d")
+            for n in range(count):
+                yield times[n], slots[n], values[n]
+
+    def duration(self):
+        if not self.index:
+            return 0.0
+        return (max(entry[4] for entry in self.index) - min(entry[3] for entry in self.index)) / 1e9
+
+    def close(self):
+        self.view.release()
+        self.map.close()
+        self.file.close()
+
+
+class ReplaySerial:
+    '''
+    Looks enough like serial.Serial for MEITE: read(), in_waiting, write(), is_open, close().
+    Writes (start reporting, ACKs) are swallowed.  At the end of the capture read() behaves
+    like a quiet port, and on_eof() is called once so a runner can stop.
+    '''
+    def __init__(self, path, speed=1.0, baud=115200, timeout=1.0, chunk=1024):
+        self.path = path
+        self.speed = speed
+        self.timeout = timeout
+        self.is_open = True
+        self.on_eof = None
+        self.bytes_read = 0
+        self.capture_time = 0.0     # seconds into the capture of the data read() is handing out
+        self.reader = None
+        self.raw = None
+        if LogReader.is_log(path):
+            self.reader = LogReader(path)
+            self._chunks = self.reader.frames()
+        else:
+            self._file = open(path, "rb")
+            self.raw = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._chunks = self._raw_chunks(memoryview(self.raw), baud / 10.0, chunk)
+        self._pending = memoryview(b"")
+        self._due = 0.0
+        self._eof = False
+        self._start = None
+
+    @staticmethod
+    def _raw_chunks(view, bytes_per_second, chunk):
+        '''A raw dump has no timestamps, pace it at the line rate'''
+        for pos in range(0, len(view), chunk):
+            yield int(pos / bytes_per_second * 1e9), view[pos:pos + chunk]
+
+    def _next(self):
+        '''Move on to the next chunk, returns False at the end of the capture'''
+        try:
+            t, data = next(self._chunks)
+        except StopIteration:
+            if not self._eof:
+                self._eof = True
+                if self.on_eof is not None:
+                    self.on_eof()
+            return False
+        if self._start is None:
+            self._start = time.monotonic() - (t / 1e9 / self.speed if self.speed else 0)
+        self._due = self._start + t / 1e9 / self.speed if self.speed else 0.0
+        self.capture_time = t / 1e9
+        self._pending = data
+        return True
+
+    @property
+    def in_waiting(self):
+        if not self._pending and not self._next():
+            return 0
+        if self.speed and time.monotonic() < self._due:
+            return 0
+        return len(self._pending)
+
+    def read(self, size=1):
+        if not self._pending and not self._next():
+            time.sleep(self.timeout)
+            return b""
+        if self.speed:
+            wait = self._due - time.monotonic()
+            if wait > self.timeout:
+                time.sleep(self.timeout)
+                return b""
+            if wait > 0:
+                time.sleep(wait)
+        data = self._pending[:size]
+        self._pending = self._pending[size:]
+        self.bytes_read += len(data)
+        return data
+
+    def write(self, data):
+        return len(data)
+
+    def close(self):
+        self.is_open = False
+
+
+def replay_pipeline(path, speed=0, verbose=False):
+    '''
+    Run a capture through MEITE -> MEITEDecoder -> SerialToMQTT.publish onto an in-process bus,
+    returns throughput numbers for the decode pipeline.  The publish policy runs on capture time,
+    so published counts what the dash would have been sent at any replay speed.
+    '''
+    from serial_to_mqtt import SerialToMQTT
+    from telemetry_bus import TelemetryBus
+
+    bus = TelemetryBus()
+    published = [0]
+
+    def count(topic, value):
+        published[0] += 1
+
+    bus.subscribe_all(count)
+    bridge = SerialToMQTT(client=None, bus=bus, verbose=verbose)
+    ser = ReplaySerial(path, speed=speed, timeout=0.05)
+    ecu = bridge.ecu
+    ecu.ser = ser
+    bridge.clock = lambda: ser.capture_time
+    ser.on_eof = lambda: setattr(ecu, "running", False)
+    ecu.running = True
+
+    frames = 0
+    start = time.perf_counter()
+    for frame in ecu.read_frames():
+        bridge.publish(ecu.parse_frame(frame))
+        frames += 1
+    elapsed = time.perf_counter() - start
+    return {
+        "frames": frames,
+        "bytes": ser.bytes_read,
+        "seconds": elapsed,
+        "frames_per_second": frames / elapsed if elapsed else None,
+        "mbytes_per_second": ser.bytes_read / elapsed / 1e6 if elapsed else None,
+        "published": published[0],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a capture through the MEITE decode pipeline")
+    parser.add_argument("path", help="drive log from recorder.py or a raw serial dump")
+    parser.add_argument("--speed", type=float, default=0, help="1 = real time, N = N times faster, 0 = flat out")
+    parser.add_argument("--verbose", action="store_true", help="print every published value")
+    args = parser.parse_args()
+
+    stats = replay_pipeline(args.path, args.speed, args.verbose)
+    print(f"[REPLAY] {stats['frames']} frames, {stats['bytes']} bytes in {stats['seconds']:.3f} s")
+    if stats["frames_per_second"]:
+        print(f"[REPLAY] {stats['frames_per_second']:.0f} frames/s, {stats['mbytes_per_second']:.2f} MB/s, "
+              f"{stats['published']} values published")
+
+
+if __name__ == "__main__":
+    main()
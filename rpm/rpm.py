@@ -1,49 +1,57 @@
-import pygame
+import time
 from constants import *
+from smoothing import Smoother, sweep
+from bar_strip import BarStrip
 
 global testingStatus
 testingStatus = False
 
 class RpmGauge:
-	def __init__(self, posxy, qty):
+	def __init__(self, posxy, qty, base, lit, smoother=None, resolution=RPM_STEP):
+		'''base is the base layer with the unlit bar already baked in at posxy, lit the fully lit artwork - see bar_strip.py'''
 		self.posxy = posxy
 		self.qty = qty
-		self.image = 0
+		self.strip = BarStrip(base, lit, posxy)
+		if len(self.strip) != qty:
+			print(f"[RPM] Found {len(self.strip)} segments in the lit artwork, expected {qty}")
+		#	rpm the bar moves in - RPM_STEP lights whole segments, less lights part of one
+		self.resolution = resolution
+		#	Straight through unless a Smoother with attack/decay is passed in
+		self.smoother = smoother or Smoother()
+		self.lit = 0
 		self.frame = 000
-		self.set_image(self.frame)
-		self.grw_flag = True
+		self.set_lit(self.frame)
 
-	def get_image(self):
-		return self.image
+	def get_lit(self):
+		return self.lit
 
-	def set_image(self, frame):
-		if not frame == 0:
-			image = str(frame)+".png"
-			self.image = pygame.image.load('images/rpm/RPM ' + image)
-		else:
-			image = "000.png"
-			self.image = pygame.image.load('images/rpm/RPM ' + image)
+	def set_lit(self, frame):
+		'''Light the bar up to this rpm, rounded down to the resolution'''
+		level = (int(frame) // self.resolution) * self.resolution / RPM_STEP
+		self.lit = self.strip.extent(level)
 
 	def get_pos(self):
 		return (self.posxy)
 
-	def set_frame(self, frame):
-		self.frame = frame
-		self.set_image(frame)
+	def set_frame(self, frame, now=None):
+		'''A new rpm sample, the bar gets there through the smoother'''
+		if now is None:
+			now = time.monotonic()
+		self.smoother.sample(frame, now)
+		self.update(now)
 
 	def get_frame(self):
 		return self.frame
 
-	def show(self, screen):
-		screen.blit(self.get_image(), self.get_pos())
+	def update(self, now):
+		'''Move the bar to where it should be at frame time now'''
 		if testingStatus == True:
-			if self.get_frame() == self.qty:
-				self.grw_flag = False
-			if self.get_frame() == 0:
-				self.grw_flag = True
-			if self.grw_flag:
-				self.set_frame(self.get_frame() + 1)
-			else:
-				self.set_frame(self.get_frame() - 1)
-		else:
-			self.get_frame()
\ No newline at end of file
+			self.smoother.sample(sweep(now, TEST_SWEEP_PERIOD) * self.qty * RPM_STEP, now)
+		self.frame = self.smoother.update(now)
+		self.set_lit(self.frame)
+
+	def moving(self, now):
+		return testingStatus == True or self.smoother.moving(now)
+
+	def show(self, screen):
+		return self.strip.draw(screen, self.lit)
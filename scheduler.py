@@ -0,0 +1,78 @@
+'''
+Decides when the dash draws its next frame.
+
+Redrawing 60 times a second while the car is parked keeps a core busy for
+nothing.  Instead the main loop sleeps until something can have changed:
+
+    a telemetry write       TelemetryStore.wake is set by every writer
+    a timer coming due      clock minute rollover, blink phases, overlay refresh
+    the last frame drew     something may still be animating, keep going at full rate
+
+and otherwise wakes at idle_fps just to pump window events.  Frames are never
+closer together than 1/max_fps, and a change never waits for longer than that,
+so the worst case from a telemetry write to the display update is one frame
+interval plus the draw itself.
+'''
+import time
+
+
+def every(period, active=None):
+    '''Timer for add_timer() that comes due on every multiple of period seconds, optionally only while active()'''
+    def next_due(now):
+        if active is not None and not active():
+            return None
+        return now + period - (now % period)
+    return next_due
+
+
+def next_minute(now):
+    '''Timer for add_timer(), due just after the wall clock minute rolls over'''
+    return now + 60.0 - (time.time() % 60.0) + 0.01
+
+
+class FrameScheduler:
+    def __init__(self, wake, max_fps=60, idle_fps=4, hold=0.0):
+        self.wake = wake                    # threading.Event set by telemetry writers
+        self.min_interval = 1.0 / max_fps
+        self.idle_interval = 1.0 / idle_fps
+        self.hold = hold                    # stay at full rate this much longer after the last frame that drew
+        self.timers = []
+        self.last_frame = 0.0
+        self.active_until = 0.0
+        self.frames = 0
+        self.idle_frames = 0
+
+    def add_timer(self, next_due):
+        '''next_due(now) -> monotonic time of the next wake up, or None when there is nothing to wait for'''
+        self.timers.append(next_due)
+
+    def wait(self, drew):
+        '''
+        Sleep until the next frame should be drawn.
+        drew is whether the frame just drawn put anything on screen.
+        '''
+        now = time.monotonic()
+        if drew:
+            self.active_until = now + self.hold
+        earliest = self.last_frame + self.min_interval
+
+        if drew or now < self.active_until:
+            deadline = earliest
+        else:
+            #   Idle - sleep until a write, a timer or the idle poll, whichever comes first
+            deadline = now + self.idle_interval
+            for next_due in self.timers:
+                due = next_due(now)
+                if due is not None and due < deadline:
+                    deadline = due
+            if not self.wake.wait(max(0.0, deadline - now)):
+                self.idle_frames += 1
+            deadline = earliest
+
+        delay = deadline - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        #   Cleared before the snapshot is taken, so a write landing after this wakes the next frame
+        self.wake.clear()
+        self.last_frame = time.monotonic()
+        self.frames += 1
@@ -1,8 +1,11 @@
 import paho.mqtt.client as mqtt
 import json
+import time
 
 from meite import MEITE
+from ecu_session import MEITESession
 from meite_decoder import MEITEDecoder
+from publish_policy import PublishPolicy
 
 # # -------------- Example Usage --------------
 # from serial_to_mqtt import SerialToMQTT
@@ -23,6 +26,31 @@ CHANNEL_TO_TOPIC = {
     # you can add more as needed
 }
 
+# Smallest change worth publishing per topic, anything not listed publishes on any change
+TOPIC_DEADBANDS = {
+    "engine/rpm/state": 50,
+    "engine/coolant/state": 1,
+    "engine/boost/state": 1,
+    "engine/fuel/state": 0.05,
+    "engine/injector_duty/state": 0.5,
+    "engine/o2/state": 0.01,
+    "engine/tps/state": 0.5,
+    "cabin/speed_cv/state": 0,
+}
+
+# Most publishes per second per topic, the dash only draws at 60 FPS anyway
+TOPIC_MAX_RATES = {
+    "engine/rpm/state": 30,
+    "engine/coolant/state": 2,
+}
+DEFAULT_MAX_RATE = 20
+
+# Unchanged values are re-sent after this long, the odometer integrates speed between updates
+# and ignores gaps over odometer.MAX_GAP, so a steady speed has to keep coming well inside that
+TOPIC_KEEPALIVES = {
+    "cabin/speed_cv/state": 1.0,
+}
+
 # client.message_callback_add('engine/egt/state', on_message_egt)
 # client.message_callback_add('engine/oilpressure/state', on_message_oilpressure)
 # client.message_callback_add('engine/fuel/state', on_message_fuel)
@@ -40,18 +68,35 @@ CHANNEL_TO_TOPIC = {
 # client.message_callback_add('indicator/glow/state', on_message_glow)
 
 class SerialToMQTT:
-    def __init__(self, client, port="/dev/ttyUSB0", baud=115200, broker="localhost", mqtt_port=1883, topic_base="me221"):
-        self.ecu = MEITE(port=port, baud=baud)
+    def __init__(self, client, port="/dev/ttyUSB0", baud=115200, broker="localhost", mqtt_port=1883, topic_base="me221",
+                 policy=None, publish_raw=False, publish_json=False, verbose=False, bus=None):
+        self.ecu = MEITE(port=port, baud=baud, verbose=verbose)
         self.broker = broker
         self.mqtt_port = mqtt_port
         self.topic_base = topic_base
 
         # Decoder initialisation
         self.decoder = MEITEDecoder()
+        self.mapped = []  # [(index into decoded values, topic), ...] for the current channel map
+
+        # What actually gets published - debug streams are off unless asked for
+        if policy is None:
+            policy = PublishPolicy(TOPIC_DEADBANDS, TOPIC_MAX_RATES, default_max_rate=DEFAULT_MAX_RATE,
+                                   keepalives=TOPIC_KEEPALIVES)
+        self.policy = policy
+        self.clock = time.monotonic  # what the policy's rate caps and keepalives count in, a replay uses capture time
+        self.publish_raw = publish_raw
+        self.publish_json = publish_json
+        self.verbose = verbose
+        self.tracer = None  # latency.LatencyTracer, stamps decode and publish when set
 
         # MQTT client setup
-        self.client = client  # Use the client passed in
+        self.client = client  # Use the client passed in, may be None when only feeding the bus
         self.running = False
+
+        # Dash values go onto the in-process bus when there is one, otherwise straight to MQTT
+        self.bus = bus
+        self.send = bus.publish if bus is not None else client.publish
         # self.client = mqtt.Client(client_id="me221_bridge", protocol=mqtt.MQTTv311)
         # self.client.connect(self.broker, self.mqtt_port, 60)
         # self.client.loop_start()
@@ -72,34 +117,62 @@ class SerialToMQTT:
         except KeyboardInterrupt:
             self.stop()
 
+    async def run(self, ack_interval=1.0):
+        """start() on an asyncio loop - non-blocking reads, ACKs as a task, stops as soon as it is cancelled"""
+        self.running = True
+        session = MEITESession(self.ecu, lambda frame: self.publish(self.ecu.parse_frame(frame)), ack_interval)
+        try:
+            await session.run()
+        finally:
+            self.running = False
+            print("[SerialToMQTT] Stopped")
+
     def publish(self, parsed):
         """Publish ECU data to MQTT"""
-        # Always publish raw payload (hex string)
-        raw_topic = f"{self.topic_base}/raw"
-        self.client.publish(raw_topic, parsed["payload"].hex())
+        # Raw payload (hex string) only when debugging
+        if self.publish_raw and self.client is not None:
+            raw_topic = f"{self.topic_base}/raw"
+            self.client.publish(raw_topic, parsed["payload"].hex())
 
         if parsed["class_id"] == 0:  # Reporting class
             if parsed["msg_id"] == 2:
                 # Set State Response → channel definitions
                 self.decoder.parse_definition(parsed["payload"])
-                self.client.publish(f"{self.topic_base}/definition", parsed["payload"].hex())
+                names = self.decoder.names
+                self.mapped = [(names.index(name), topic) for name, topic in CHANNEL_TO_TOPIC.items() if name in names]
+                if self.client is not None:
+                    self.client.publish(f"{self.topic_base}/definition", parsed["payload"].hex())
                 print("[MQTT] Updated channel definitions")
 
             elif parsed["msg_id"] == 0:
                 # Report Response → actual live data
-                values = self.decoder.parse_data(parsed["payload"])
+                values = self.decoder.parse_values(parsed["payload"])
+                tracer = self.tracer
+                if tracer is not None:
+                    tracer.mark_decode()
                 if values:
-                    # Publish full JSON
-                    decoded_topic = f"{self.topic_base}/decoded"
-                    self.client.publish(decoded_topic, json.dumps(values))
-                    # print(f"[MQTT] Published {decoded_topic} → {values}")
-
-                    # Publish only mapped signals to dash topics
-                    for channel_name, topic in CHANNEL_TO_TOPIC.items():
-                        if channel_name in values:
-                            val = values[channel_name]
-                            self.client.publish(topic, val)
-                            print(f"[MQTT] Published {topic} → {val}")
+                    # Full JSON only when debugging
+                    if self.publish_json and self.client is not None:
+                        decoded_topic = f"{self.topic_base}/decoded"
+                        self.client.publish(decoded_topic, json.dumps(dict(zip(self.decoder.names, values))))
+
+                    # Publish mapped signals to dash topics, only the ones that moved
+                    now = self.clock()
+                    should_publish = self.policy.should_publish
+                    send = self.send
+                    for index, topic in self.mapped:
+                        if index < len(values):
+                            val = values[index]
+                            if should_publish(topic, val, now):
+                                if tracer is not None:
+                                    tracer.mark_publish(topic)
+                                send(topic, val)
+                                if self.verbose:
+                                    print(f"[MQTT] Published {topic} → {val}")
+
+    def topics(self):
+        """Every dash topic this bridge feeds"""
+        return set(CHANNEL_TO_TOPIC.values())
 
     def stop(self):
         """Stop everything cleanly"""
@@ -0,0 +1,289 @@
+'''
+ECU ingest in its own process, feeding the dash through shared memory.
+
+Serial reads, frame decoding, the publish policy and the MQTT mirror all run
+in a separate process (IngestProcess), so they no longer share the GIL with
+the pygame loop.  Decoded dash values are written into a
+multiprocessing.shared_memory block guarded by a sequence lock:
+
+    u64 sequence, one f64 per telemetry slot (CHANNELS order), then one u64
+    write count per slot
+
+The writer makes the sequence odd, writes, and makes it even again.  The
+reader copies the values and keeps the copy only if the sequence was even
+and unchanged across it.  Neither side takes a lock or ever waits for the
+other - a busy writer just means the frame uses the previous copy.  The write
+counts tell the reader which slots were written since its last copy even when
+the value is the same, so hooks like the odometer see a steady speed too.
+'''
+import multiprocessing
+import threading
+import time
+from array import array
+from multiprocessing import shared_memory
+
+from telemetry import CHANNELS
+
+HEADER_SIZE = 8
+
+
+def block_size(channels=CHANNELS):
+    return HEADER_SIZE + 16 * len(channels)
+
+
+def _views(buf, channels):
+    '''(sequence, values, write counts) views of a block'''
+    count = len(channels)
+    values_end = HEADER_SIZE + 8 * count
+    return (buf[:HEADER_SIZE].cast("Q"), buf[HEADER_SIZE:values_end].cast("d"),
+            buf[values_end:values_end + 8 * count].cast("Q"))
+
+
+class SharedTelemetryWriter:
+    '''
+    The ingest process's side of the block.
+    Has set() and set_many() like TelemetryStore, so a ChannelDispatcher can write straight into it.
+    The bus and the MQTT thread both write, the lock keeps them to one writer at a time.
+    '''
+    def __init__(self, name, wake=None, channels=CHANNELS):
+        #   The child shares the dash's resource tracker, the dash unlinks the block when it stops
+        self.shm = shared_memory.SharedMemory(name=name)
+        self.seq, self.values, self.writes = _views(self.shm.buf, channels)
+        self.wake = wake    # multiprocessing.Event, tells the dash there is something new
+        self.lock = threading.Lock()
+
+    def set(self, slot, value):
+        seq = self.seq
+        with self.lock:
+            seq[0] += 1
+            self.values[slot] = value
+            self.writes[slot] += 1
+            seq[0] += 1
+        if self.wake is not None and not self.wake.is_set():
+            self.wake.set()
+
+    def set_many(self, updates):
+        seq = self.seq
+        values = self.values
+        writes = self.writes
+        with self.lock:
+            seq[0] += 1
+            for slot, value in updates:
+                values[slot] = value
+                writes[slot] += 1
+            seq[0] += 1
+        if self.wake is not None and not self.wake.is_set():
+            self.wake.set()
+
+    def get(self, slot):
+        return self.values[slot]
+
+    def close(self):
+        self.seq.release()
+        self.values.release()
+        self.writes.release()
+        self.shm.close()
+
+
+class SharedTelemetryReader:
+    '''
+    The dash's side.  Looks like a TelemetryStore to the render loop (snapshot(), get(), wake),
+    with the slots in owned coming from the ingest process and the rest from the local store,
+    which the dash's own ChannelDispatcher keeps writing MQTT values into.
+    hooks {slot: function(value)} run on the render thread when an owned slot was written, e.g. the odometer -
+    once per new copy of the block with the latest value, whether or not the value changed.
+    '''
+    def __init__(self, shm, owned, local, wake, hooks=None, channels=CHANNELS):
+        self.local = local
+        self.owned = sorted(owned)
+        self.seq, self.shared, self.shared_writes = _views(shm.buf, channels)
+        self.latest = array("d", bytes(8 * len(channels)))  # last consistent copy of the block
+        self.latest_writes = array("Q", bytes(8 * len(channels)))
+        self.values = array("d", bytes(8 * len(channels)))  # what snapshot() hands out
+        self._taken = None
+        self.hooks = {slot: hook for slot, hook in (hooks or {}).items() if slot in owned}
+        self.hooked = {slot: 0 for slot in self.hooks}   # write count each hook last ran at
+        self.retries = 0
+        #   The scheduler waits on the local store's event, pass the ingest process's wake ups on to it
+        self.wake = local.wake
+        threading.Thread(target=self._forward, args=(wake,), daemon=True).start()
+
+    def _forward(self, wake):
+        while True:
+            wake.wait()
+            wake.clear()
+            self.wake.set()
+
+    def _read_shared(self):
+        '''Copy the block if it changed since the last read, True if a new consistent copy was taken'''
+        seq = self.seq
+        for _ in range(16):
+            before = seq[0]
+            if before == self._taken:
+                return False
+            if before & 1:
+                self.retries += 1
+                continue
+            memoryview(self.latest)[:] = self.shared
+            memoryview(self.latest_writes)[:] = self.shared_writes
+            if seq[0] == before:
+                self._taken = before
+                return True
+            self.retries += 1
+        return False
+
+    def snapshot(self):
+        local, changed = self.local.snapshot()
+        shared = self._read_shared()
+        if not (changed or shared):
+            return self.values, False
+        values = self.values
+        values[:] = local
+        latest = self.latest
+        for slot in self.owned:
+            values[slot] = latest[slot]
+        if shared:
+            writes = self.latest_writes
+            for slot, hook in self.hooks.items():
+                if writes[slot] != self.hooked[slot]:
+                    self.hooked[slot] = writes[slot]
+                    hook(latest[slot])
+        return values, True
+
+    def get(self, slot):
+        if slot in self.owned:
+            return self.latest[slot]
+        return self.local.get(slot)
+
+    def set(self, slot, value):
+        self.local.set(slot, value)
+
+    def set_many(self, updates):
+        self.local.set_many(updates)
+
+    def close(self):
+        self.seq.release()
+        self.shared.release()
+        self.shared_writes.release()
+
+
+def run_ingest(name, wake, stop, port, baud, replay_path, replay_speed, mirror_mqtt, broker, record_path):
+    '''
+    Entry point of the ingest process: serial -> MEITE -> decoder -> bus -> shared block (+ MQTT mirror).
+    The same topics from other publishers on the broker go into the shared block too.
+    '''
+    import paho.mqtt.client as mqttClient
+    from channels import ChannelDispatcher, CHANNEL_TABLE
+    from ecu_session import SessionRunner
+    from serial_to_mqtt import SerialToMQTT
+    from telemetry_bus import TelemetryBus, MqttMirror
+
+    store = SharedTelemetryWriter(name, wake)
+    bus = TelemetryBus()
+    client = mqttClient.Client(client_id="me221_ingest")
+    mirror = None
+    if mirror_mqtt:
+        mirror = MqttMirror(client)
+        bus.subscribe_all(mirror)
+
+    bridge = SerialToMQTT(client=client, port=port, baud=baud, bus=bus)
+    if replay_path:
+        from replay import ReplaySerial
+        bridge.ecu.ser = ReplaySerial(replay_path, speed=replay_speed)
+    #   Only the bridge's topics, the dash's own dispatcher handles the rest of the table
+    topics = bridge.topics()
+    dispatcher = ChannelDispatcher(store, [channel for channel in CHANNEL_TABLE if channel.topic in topics])
+    dispatcher.attach_bus(bus, topics, mirror)
+
+    client.on_message = dispatcher.on_message
+    client.on_connect = lambda client, userdata, flags, rc: dispatcher.subscribe(client)
+    #   Serial -> shared block needs no broker, without one the client just keeps retrying in the background
+    client.connect_async(broker[0], port=broker[1])
+    client.loop_start()
+
+    recorder = None
+    if record_path:
+        from recorder import Recorder
+        recorder = Recorder(record_path)
+        recorder.start()
+        bridge.ecu.recorder = recorder
+        dispatcher.recorder = recorder
+
+    sessions = SessionRunner()
+    sessions.start()
+    sessions.submit(bridge.run())
+    try:
+        stop.wait()
+    finally:
+        sessions.stop()
+        if recorder is not None:
+            recorder.close()
+        client.loop_stop()
+        store.close()
+        print("[INGEST] Stopped")
+
+
+class IngestProcess:
+    '''
+    Owns the shared block and the ingest process.
+    reader() gives the dash its TelemetryStore stand-in, topics() the MQTT topics the process now feeds.
+    '''
+    def __init__(self, port, baud=115200, replay_path=None, replay_speed=1.0, mirror_mqtt=False,
+                 broker=("localhost", 1883), record_path=None, channels=CHANNELS):
+        #   Forked, not spawned - spawn would re-run main.py's module level and open a second window.
+        #   Start it before the dash starts any threads, the child never touches pygame.
+        context = multiprocessing.get_context("fork")
+        self.shm = shared_memory.SharedMemory(create=True, size=block_size(channels))
+        self.shm.buf[:block_size(channels)] = bytes(block_size(channels))
+        self.wake = context.Event()
+        self.stop_event = context.Event()
+        self.channels = channels
+        self.shared_reader = None
+        self.checked_at = 0.0
+        self.dead = False
+        self.process = context.Process(
+            target=run_ingest, name="ecu-ingest", daemon=True,
+            args=(self.shm.name, self.wake, self.stop_event, port, baud,
+                  replay_path, replay_speed, mirror_mqtt, broker, record_path))
+
+    def topics(self):
+        from serial_to_mqtt import CHANNEL_TO_TOPIC
+        return set(CHANNEL_TO_TOPIC.values())
+
+    def reader(self, local, hooks=None):
+        from channels import CHANNEL_TABLE
+        topics = self.topics()
+        owned = {channel.slot for channel in CHANNEL_TABLE if channel.topic in topics}
+        self.shared_reader = SharedTelemetryReader(self.shm, owned, local, self.wake, hooks, self.channels)
+        return self.shared_reader
+
+    def start(self):
+        self.process.start()
+        print(f"[INGEST] ECU ingest running in process {self.process.pid}")
+
+    def check(self, interval=1.0):
+        '''Cheap enough for every frame: looks at the process once per interval, logs once if it has died'''
+        if self.dead:
+            return False
+        now = time.monotonic()
+        if now - self.checked_at < interval:
+            return True
+        self.checked_at = now
+        if self.process.is_alive():
+            return True
+        self.dead = True
+        print(f"[INGEST] ECU ingest process exited with code {self.process.exitcode}, ECU values are no longer updated")
+        return False
+
+    def stop(self):
+        #   Setting the event waits for the sleeping child to wake up, which a dead one never does
+        if self.process.is_alive():
+            self.stop_event.set()
+            self.process.join(5)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        if self.shared_reader is not None:
+            self.shared_reader.close()
+        self.shm.close()
+        self.shm.unlink()
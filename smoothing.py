@@ -0,0 +1,82 @@
+'''
+Time based smoothing for the bar gauges.
+
+The ECU reports at its own rate, the dash draws at its own rate.  A Smoother
+takes samples whenever they arrive and answers "what should the bar show
+right now" for any frame time:
+
+    interpolation   while samples keep coming (no more than horizon seconds
+                    apart) a new one isn't jumped to, the target walks there
+                    from where it was over the time the sample took to come,
+                    at display rate.  A sample after a quiet spell is a step
+                    and is taken straight away.  The target never goes past
+                    the last sample: the bridge doesn't repeat unchanged
+                    values, so a missing sample usually means a plateau, and
+                    a tacho must never show revs the engine didn't reach
+    attack / decay  the shown value follows that target with a first order lag,
+                    attack seconds when rising and decay seconds when falling
+                    (0 = jump straight there)
+
+Everything is in seconds, so the motion looks the same at 20 or 60 FPS and
+with samples every 20 ms or every 200 ms.
+'''
+import math
+
+
+def sweep(now, period):
+    '''Triangle wave 0 -> 1 -> 0 over period seconds, for the gauge test sweep'''
+    phase = (now % period) / period
+    return 2 * phase if phase < 0.5 else 2 - 2 * phase
+
+
+class Smoother:
+    def __init__(self, attack=0.0, decay=0.0, horizon=0.0, epsilon=0.01):
+        self.attack = attack
+        self.decay = decay
+        self.horizon = horizon
+        self.epsilon = epsilon      # closer than this to the target counts as there
+        self.last = 0.0             # latest sample
+        self.start = 0.0            # where the target was when it arrived
+        self.duration = 0.0         # seconds the target takes from start to last
+        self.sampled_at = None
+        self.shown = 0.0
+        self.updated_at = None
+
+    def sample(self, value, now):
+        if self.sampled_at is not None and self.horizon:
+            self.start = self.target(now)
+            #   As long as the sample took to come, a sample after a quiet spell is a step - no walk, no added delay
+            elapsed = now - self.sampled_at
+            self.duration = elapsed if 0 < elapsed <= self.horizon else 0.0
+        else:
+            self.start = value
+        self.last = value
+        self.sampled_at = now
+
+    def target(self, now):
+        '''Where the value should be now, between where it was and the last sample - never beyond it'''
+        if self.sampled_at is not None and self.duration > 0:
+            progress = (now - self.sampled_at) / self.duration
+            if progress < 1:
+                return self.start + (self.last - self.start) * max(progress, 0.0)
+        return self.last
+
+    def update(self, now):
+        '''Step the shown value to frame time now and return it'''
+        target = self.target(now)
+        elapsed = now - self.updated_at if self.updated_at is not None else 0.0
+        self.updated_at = now
+        lag = self.attack if target > self.shown else self.decay
+        if lag <= 0:
+            self.shown = target
+        elif elapsed > 0:
+            self.shown += (target - self.shown) * (1.0 - math.exp(-elapsed / lag))
+        if abs(target - self.shown) < self.epsilon:
+            self.shown = target
+        return self.shown
+
+    def moving(self, now):
+        '''True while the shown value will still change without a new sample'''
+        if self.shown != self.last:
+            return True
+        return self.sampled_at is not None and now - self.sampled_at < self.duration
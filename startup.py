@@ -0,0 +1,52 @@
+'''
+Cold start - getting from ignition to a live dash as quickly as possible.
+
+The window is opened exactly once, here, with only the pygame module the
+dash uses: display - not the mixer or joystick, and the seven segment
+readouts need no fonts.  The background goes on the glass the moment it is
+decoded, and PhaseTimer reports where the rest of the start up time went.
+Compiling the layout (loading the images, measuring the bar segments and
+building the readout cells) is most of it:
+
+    [STARTUP] window 6 ms | background 3 ms | imports 2 ms | layout 50 ms | first frame 3 ms | total 64 ms
+'''
+import time
+
+import pygame
+
+import assets
+from constants import WIDTH, HEIGHT
+
+
+class PhaseTimer:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.last = self.started
+        self.phases = []
+
+    def mark(self, name):
+        '''End the current phase and call it name'''
+        now = time.perf_counter()
+        self.phases.append((name, now - self.last))
+        self.last = now
+
+    def report(self):
+        total = self.last - self.started
+        print("[STARTUP] " + " | ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in self.phases)
+              + f" | total {total * 1000:.0f} ms")
+
+
+def open_window(caption, icon=None):
+    pygame.display.init()
+    if icon:
+        pygame.display.set_icon(pygame.image.load(icon))
+    pygame.display.set_caption(caption)
+    return pygame.display.set_mode((WIDTH, HEIGHT), pygame.DOUBLEBUF)
+
+
+def show_background(window, path):
+    '''Put the background up straight away, before anything else is ready'''
+    background = assets.load_image(path)
+    window.blit(background, (0, 0))
+    pygame.display.flip()
+    return background
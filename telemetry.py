@@ -0,0 +1,72 @@
+'''
+Telemetry store shared between the MQTT/serial threads and the render loop.
+
+Every dash channel has a fixed slot in a flat array.  Writers only ever touch
+the back buffer, and the render loop takes one consistent snapshot per frame
+by swapping the buffers, so it never sees half an update and never blocks a
+writer for longer than a copy of a few dozen doubles.
+'''
+import threading
+from array import array
+
+#   Every channel the dash shows, in slot order
+CHANNELS = (
+    "rpm", "coolant", "egt", "oilpressure", "boost",
+    "fuel", "outside_temp", "speed", "speed_gps",
+    "illumination", "foglight", "defog", "highbeam", "leftturn",
+    "rightturn", "brakewarn", "oillight", "alt", "glow",
+)
+
+(RPM, COOLANT, EGT, OILPRESSURE, BOOST,
+ FUEL, OUTSIDE_TEMP, SPEED, SPEED_GPS,
+ ILLUMINATION, FOGLIGHT, DEFOG, HIGHBEAM, LEFTTURN,
+ RIGHTTURN, BRAKEWARN, OILLIGHT, ALT, GLOW) = range(len(CHANNELS))
+
+SLOT = {name: slot for slot, name in enumerate(CHANNELS)}
+
+
+class TelemetryStore:
+    def __init__(self, channels=CHANNELS):
+        self.channels = channels
+        self._back = array("d", bytes(8 * len(channels)))
+        self._front = array("d", self._back)
+        self._lock = threading.Lock()
+        self._written = 0   #   bumped by every write
+        self._taken = 0     #   value of _written at the last snapshot
+        self.wake = threading.Event()   #   set by every write, for the frame scheduler
+
+    def set(self, slot, value):
+        '''Called from the network threads, slot is one of the constants above'''
+        with self._lock:
+            self._back[slot] = value
+            self._written += 1
+        if not self.wake.is_set():
+            self.wake.set()
+
+    def set_many(self, updates):
+        '''Several (slot, value) pairs that belong together, applied in one go'''
+        with self._lock:
+            back = self._back
+            for slot, value in updates:
+                back[slot] = value
+            self._written += 1
+        if not self.wake.is_set():
+            self.wake.set()
+
+    def get(self, slot):
+        '''Latest written value, for code outside the render loop'''
+        with self._lock:
+            return self._back[slot]
+
+    def snapshot(self):
+        '''
+        Called once per frame from the render loop.
+        Returns (values, changed) - values stays untouched until the next snapshot.
+        '''
+        with self._lock:
+            if self._written == self._taken:
+                return self._front, False
+            self._front, self._back = self._back, self._front
+            self._back[:] = self._front
+            self._taken = self._written
+        return self._front, True
@@ -0,0 +1,77 @@
+'''
+In-process publish/subscribe for telemetry.
+
+The ECU bridge runs in the same process as the dash, so its values don't
+need to go out to Mosquitto and come back just to cross a thread.  The
+bridge publishes (topic, value) here and subscribers are called straight
+away on the publishing thread, with the value still a number.
+MqttMirror is an optional subscriber that copies everything onto MQTT for
+Node-RED and anything else listening on the broker.  The broker hands those
+copies straight back to the dash, which also takes the same topics from other
+publishers, so the mirror remembers what it sent and picks out its own echoes.
+'''
+import threading
+from collections import deque
+
+
+class TelemetryBus:
+    def __init__(self):
+        self._topics = {}       # topic -> tuple of callbacks
+        self._everything = ()   # callbacks that want every topic
+        self._lock = threading.Lock()
+
+    def subscribe(self, topic, callback):
+        '''callback(topic, value) for one topic'''
+        with self._lock:
+            self._topics[topic] = self._topics.get(topic, ()) + (callback,)
+
+    def subscribe_all(self, callback):
+        '''callback(topic, value) for every topic'''
+        with self._lock:
+            self._everything = self._everything + (callback,)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            self._topics = {topic: tuple(cb for cb in callbacks if cb != callback)
+                            for topic, callbacks in self._topics.items()}
+            self._everything = tuple(cb for cb in self._everything if cb != callback)
+
+    def publish(self, topic, value):
+        # Subscriber tuples are replaced, never changed in place, so no lock is needed here
+        for callback in self._topics.get(topic, ()):
+            callback(topic, value)
+        for callback in self._everything:
+            callback(topic, value)
+
+
+class MqttMirror:
+    '''
+    Bus subscriber that republishes every value onto the MQTT broker.
+    is_echo() picks out the copies of those publishes the broker sends back, so a dash subscribed
+    to the same topics drops them while still taking the topics from anyone else (Node-RED etc).
+    '''
+    def __init__(self, client, pending=64):
+        self.client = client
+        self.pending = {}   # topic -> payloads published and not come back yet, oldest first
+        self.max_pending = pending
+        self._lock = threading.Lock()
+
+    def __call__(self, topic, value):
+        payload = str(value).encode()
+        with self._lock:
+            echoes = self.pending.get(topic)
+            if echoes is None:
+                echoes = self.pending[topic] = deque(maxlen=self.max_pending)
+            echoes.append(payload)
+        self.client.publish(topic, payload)
+
+    def is_echo(self, topic, payload):
+        '''True, once, for each of our own publishes the broker hands back'''
+        with self._lock:
+            echoes = self.pending.get(topic)
+            if not echoes or payload not in echoes:
+                return False
+            #   Copies come back in the order they went out, any older ones were lost on the way
+            while echoes.popleft() != payload:
+                pass
+            return True